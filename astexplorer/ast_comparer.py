@@ -1,15 +1,31 @@
-from typing import List, Callable, Iterable
+import bisect
+import heapq
+from collections import OrderedDict
+from typing import List, Callable, Iterable, Dict, Tuple, Iterator
 
-from astexplorer.brief_node import BriefNode, VAR_NAMES_INDEX
+from astexplorer.brief_node import BriefNode
 from astexplorer.copypaste import *
 from astexplorer.func_tree import FuncTree
+from astexplorer.hash_index import StatementHashIndex
 from astexplorer.utils import *
 
 
 class AstComparer:
     def __init__(self):
         self.copypastes = []  # type: List[Copypaste]
-        self.min_cp_weight = 20
+        # copypastes lighter than that are not reported, and the statement
+        # lists that can't hold such a copypaste are not compared;
+        # 0 - all copypastes are reported
+        self.min_cp_weight = 0
+        # the previous run's state, used by update_copypastes()
+        self.functions = []  # type: List[FuncTree]
+        self.index = StatementHashIndex()
+        # { (function A key, function B key): copypastes found comparing A with B }
+        self.copypastes_by_pair = {}  # type: Dict[Tuple[int, int], List[Copypaste]]
+        # statistics: statement list pairs compared and skipped
+        # as too light to hold a copypaste of min_cp_weight
+        self.list_comparisons = 0
+        self.pruned_comparisons = 0
 
     def compare_pre_process_functions(self, functions: List[FuncTree]):
         # give all function arguments uniform names (p0, p1 ...)
@@ -19,6 +35,131 @@ class AstComparer:
             fun.calc_hashes()
 
     def find_copypastes(self, functions: List[FuncTree]) -> List[Copypaste]:
+        # compare only the functions sharing at least one statement hash
+        self.functions = list(functions)
+        self.index.build(functions)
+        self.copypastes_by_pair = {}
+        for i, j in self.index.find_candidate_pairs():
+            self.compare_function_pair(i, j)
+        self.filter_and_sort_copypastes()
+        return self.copypastes
+
+    def iterate_copypastes(self, functions: List[FuncTree],
+                           max_seen: int = 100000) -> Iterator[Copypaste]:
+        # yields copypastes as soon as each function pair is compared.
+        # Unlike find_copypastes(), the results are neither stored nor sorted, and
+        # the duplicates are dropped by the keys of the last max_seen copypastes,
+        # the first found copypaste is kept. The state used by update_copypastes()
+        # is left as it is
+        index = StatementHashIndex()
+        index.build(functions)
+        seen = OrderedDict()  # type: OrderedDict[str, None]
+        for i, j in index.find_candidate_pairs():
+            stored_copypastes = self.copypastes
+            self.copypastes = []
+            self.find_func_copypastes(index.functions[i], index.functions[j])
+            pair_copypastes = self.copypastes
+            self.copypastes = stored_copypastes
+            for cp in pair_copypastes:
+                key = self.get_copypaste_key(cp)
+                if key in seen:
+                    seen.move_to_end(key)
+                    continue
+                seen[key] = None
+                if len(seen) > max_seen:
+                    seen.popitem(last=False)
+                yield cp
+
+    def find_top_copypastes(self, functions: List[FuncTree], top_count: int,
+                            max_seen: int = 100000) -> List[Copypaste]:
+        # top_count heaviest copypastes, kept in a heap while scanning
+        heap = []  # type: List[Tuple[int, int, Copypaste]]
+        for order, cp in enumerate(self.iterate_copypastes(functions, max_seen)):
+            # "-order": of the equal copypastes the earlier found are kept
+            item = (self.get_copypaste_rank(cp), -order, cp)
+            if len(heap) < top_count:
+                heapq.heappush(heap, item)
+            elif item > heap[0]:
+                heapq.heapreplace(heap, item)
+        self.copypastes = [cp for _, _, cp in sorted(heap, key=lambda x: x[:2], reverse=True)]
+        return self.copypastes
+
+    def update_copypastes(self, functions: List[FuncTree]) -> List[Copypaste]:
+        # "functions" is the whole updated list, where unchanged functions are
+        # the same FuncTree objects as in the previous find_copypastes() /
+        # update_copypastes() call. Only new functions are compared, the result
+        # is the same as find_copypastes(functions) would give
+        positions = {id(f): i for i, f in enumerate(functions)}
+        removed_keys = {self.index.remove_function(f) for f in self.functions
+                        if id(f) not in positions}
+        # find_func_copypastes() is asymmetric: the pairs whose order has changed
+        # are compared again, including those that gave no copypastes before
+        moved_keys = [self.index.get_key(f) for f in
+                      self.find_moved_functions(self.functions, positions)]
+        new_keys = moved_keys + [self.index.add_function(f) for f in functions
+                                 if self.index.get_key(f) is None]
+        self.functions = list(functions)
+
+        def position(key: int) -> int:
+            return positions[id(self.index.functions[key])]
+
+        # drop removed functions' results and the pairs whose order has changed
+        for pair in list(self.copypastes_by_pair):
+            if pair[0] in removed_keys or pair[1] in removed_keys or \
+                    position(pair[0]) > position(pair[1]):
+                del self.copypastes_by_pair[pair]
+
+        compared = set()
+        for key in new_keys:
+            for partner in self.index.find_partners(key):
+                pair = (key, partner) if position(key) < position(partner) else (partner, key)
+                if pair in compared:
+                    continue
+                compared.add(pair)
+                self.compare_function_pair(pair[0], pair[1])
+
+        # collect the results in the order find_copypastes() would find them
+        self.copypastes = []
+        for pair in sorted(self.copypastes_by_pair, key=lambda p: (position(p[0]), position(p[1]))):
+            self.copypastes += self.copypastes_by_pair[pair]
+        self.filter_and_sort_copypastes()
+        return self.copypastes
+
+    @classmethod
+    def find_moved_functions(cls, functions: List[FuncTree],
+                             positions: Dict[int, int]) -> List[FuncTree]:
+        # "functions" in the previous order, "positions" - { id(function): new index }.
+        # The kept functions outside the longest run in ascending new positions:
+        # any kept pair whose order has changed has at least one of them
+        kept = [f for f in functions if id(f) in positions]
+        # tails[k] - index in "kept" of the smallest last item of an ascending run of k + 1
+        tails, tail_positions = [], []  # type: List[int], List[int]
+        previous = [-1] * len(kept)
+        for i, f in enumerate(kept):
+            k = bisect.bisect_left(tail_positions, positions[id(f)])
+            previous[i] = tails[k - 1] if k > 0 else -1
+            if k == len(tails):
+                tails.append(i)
+                tail_positions.append(positions[id(f)])
+            else:
+                tails[k] = i
+                tail_positions[k] = positions[id(f)]
+        in_order = set()
+        i = tails[-1] if tails else -1
+        while i >= 0:
+            in_order.add(i)
+            i = previous[i]
+        return [f for i, f in enumerate(kept) if i not in in_order]
+
+    def compare_function_pair(self, key_a: int, key_b: int) -> None:
+        start = len(self.copypastes)
+        self.copypastes_by_pair.pop((key_a, key_b), None)
+        self.find_func_copypastes(self.index.functions[key_a], self.index.functions[key_b])
+        if len(self.copypastes) > start:
+            self.copypastes_by_pair[(key_a, key_b)] = self.copypastes[start:]
+
+    def find_copypastes_all_pairs(self, functions: List[FuncTree]) -> List[Copypaste]:
+        # compare each function with each other function
         for i, fa in enumerate(functions):
             j = i + 1
             while j < len(functions):
@@ -33,10 +174,19 @@ class AstComparer:
 
     def find_node_copypastes(self, fa: FuncTree, fb: FuncTree,
                              a_list: List[BriefNode], b_list: List[BriefNode]) -> None:
+        # a node's weight includes its nested nodes' weight, and equal
+        # (by hash) nodes weigh the same: any copypaste found here or
+        # deeper is not heavier than any of the lists
+        if self.min_cp_weight > 0 and \
+                min(self.get_list_weight(a_list), self.get_list_weight(b_list)) < self.min_cp_weight:
+            self.pruned_comparisons += 1
+            return
+        self.list_comparisons += 1
+
         # find copypastes on the current level comparing each node by its hash
         cp_list = find_sub_sequences(a_list, b_list,
                                      lambda x, y:
-                                     x.hash_by_type[VAR_NAMES_INDEX] == y.hash_by_type[VAR_NAMES_INDEX])
+                                     x.index_hash == y.index_hash)
         for cp in cp_list:
             if cp.count < 2:
                 continue
@@ -44,6 +194,8 @@ class AstComparer:
             cpy.count = cp.count
             for i in range(cp.start_a + 1, cp.start_a + cp.count):
                 cpy.update(a_list[i])
+            if cpy.weight < self.min_cp_weight:
+                continue
             self.copypastes.append(cpy)
 
         # go down
@@ -61,10 +213,22 @@ class AstComparer:
                     continue
                 self.find_node_copypastes(fa, fb, a.body[""], b_list)
 
+    @classmethod
+    def get_list_weight(cls, nodes: List[BriefNode]) -> int:
+        return sum(n.weight for n in nodes)
+
     def filter_and_sort_copypastes(self):
-        self.copypastes = list({f'{c.func_a.file}__{c.func_b.file}__{c.start_index_a}_{c.end_index_a}_{c.start_index_a}': c
+        self.copypastes = list({self.get_copypaste_key(c): c
                                 for c in self.copypastes}.values())
-        self.copypastes.sort(key=lambda x: x.count * 100 + x.weight, reverse=True)
+        self.copypastes.sort(key=self.get_copypaste_rank, reverse=True)
+
+    @classmethod
+    def get_copypaste_key(cls, c: Copypaste) -> str:
+        return f'{c.func_a.file}__{c.func_b.file}__{c.start_index_a}_{c.end_index_a}_{c.start_index_a}'
+
+    @classmethod
+    def get_copypaste_rank(cls, c: Copypaste) -> int:
+        return c.count * 100 + c.weight
 
     def read_src_lines(self, read_file_by_path: Callable[[str], Iterable[str]]) -> str:
         # group copy-pastes by file names
@@ -1,62 +1,87 @@
-from ast import parse
+from array import array
+from ast import parse, Expr
+from bisect import bisect_right
 import codecs
-import regex as re
+from functools import partial
 from _ast import Module
-from typing import List, Tuple, Optional, Any
+from typing import List, Tuple, Optional, Any, Dict, Callable, Union
 from astexplorer.brief_node import BriefNode
 from astexplorer.func_tree import FuncTree
 
 
 class FileLines:
-    REG_NEWLINE = re.compile(r'(\r\n?|\n)+')
-    NEW_CHARS = {chr(0x0A), chr(0x0D)}
-
     def __init__(self, file_data: str):
         # start - end indices of each line
-        self.lines: List[Tuple[int, int]] = []
+        self.line_starts = array('Q')
+        self.line_ends = array('Q')
         self.get_file_lines(file_data)
 
-    def get_file_lines(self, data: str) -> None:
-        start, i = 0, -1
-
-        for c in data:
-            i += 1
-            if c not in self.NEW_CHARS:
-                continue
-            if c == chr(0x0A):
-                self.lines.append((start, i,))
-                start = i + 1
-                continue
-            if c == chr(0x0D):
-                start += 1
+    @property
+    def lines(self) -> List[Tuple[int, int]]:
+        return list(zip(self.line_starts, self.line_ends))
 
+    def get_file_lines(self, data: str) -> None:
+        # a line ends with '\n', each '\r' met moves the line's start
+        # one character forward
+        has_cr = '\r' in data
+        line_start = 0
+        line_end = data.find('\n')
+        while line_end >= 0:
+            start = line_start + data.count('\r', line_start, line_end) if has_cr else line_start
+            self.line_starts.append(start)
+            self.line_ends.append(line_end)
+            line_start = line_end + 1
+            line_end = data.find('\n', line_start)
+
+        start = line_start + data.count('\r', line_start) if has_cr else line_start
         if start < len(data):
-            self.lines.append((start, len(data),))
-
-    def get_file_lines2(self, data: str) -> None:
-        start = 0
-        for mth in self.REG_NEWLINE.finditer(data):
-            s = mth.start()
-            e = mth.end()
-            self.lines.append((start, s,))
-            start = e + 1
-        if start < len(data):
-            self.lines.append((start, len(data),))
+            self.line_starts.append(start)
+            self.line_ends.append(len(data))
 
     def get_line_start_end(self, line_num: int, col_offset: int) -> Tuple[int, int]:
-        line = self.lines[line_num - 1]
-        return line[0] + col_offset, line[1]
+        return self.line_starts[line_num - 1] + col_offset, self.line_ends[line_num - 1]
 
     def get_node_line_start_end(self, node: Any) -> Tuple[int, int]:
-        line = self.lines[node.lineno - 1]
-        return line[0] + node.col_offset, line[1]
+        return self.line_starts[node.lineno - 1] + node.col_offset, self.line_ends[node.lineno - 1]
+
+    def get_line_number(self, index: int) -> int:
+        # 1-based number of the line containing the character index
+        return max(bisect_right(self.line_starts, index), 1)
 
 
 class AstParser:
+    # { AST node class name: handlers called for the node, in order }
+    expression_handlers = {
+        'If': ('go_down_if_expression',),
+        'For': ('go_down_for_expression',),
+        'While': ('go_down_while_expression',),
+        'Call': ('go_down_call_expression',),
+        'Lambda': ('go_down_lambda_expression',),
+        'Assign': ('go_down_assign_expression',),
+        'With': ('process_with_op',),
+        # AugAssign is also given the default handler's treatment
+        'AugAssign': ('go_down_aug_assign_expression', 'process_node_id'),
+        'BinOp': ('go_down_bin_op',),
+        'UnaryOp': ('go_down_unary_op',),
+        'Compare': ('go_down_compare',),
+        'Num': ('process_num_arg',),
+        'Str': ('process_str_arg',),
+        'NameConstant': ('process_name_const',),
+        'Attribute': ('process_attribute',),
+        'Tuple': ('process_tuple',),
+        'List': ('process_list',),
+        'Raise': ('process_raise',),
+        'Return': ('process_return',),
+    }  # type: Dict[str, Tuple[Union[str, Callable[['AstParser', Any, BriefNode], None]], ...]]
+
+    # handlers for the rest of the AST node classes
+    default_expression_handlers = ('process_node_id',)
+
     def __init__(self):
         self.file_path = ''
         self.line_data: Optional[FileLines] = None
-        pass
+        # { AST node class: bound handlers }, filled from expression_handlers
+        self.handlers_by_class = {}  # type: Dict[type, Tuple[Callable[[Any, BriefNode], None], ...]]
 
     def parse_module(self, file_path: str) -> List[FuncTree]:
         with codecs.open(file_path, 'r', encoding='utf-8') as fr:
@@ -107,68 +132,36 @@ class AstParser:
         return func
 
     def go_down_expression(self, node, child):
-        if node.__class__.__name__ == "Expr":
+        node_class = node.__class__
+        if node_class is Expr:
             node = node.value
-            child.function = node.__class__.__name__
+            node_class = node.__class__
+            child.function = node_class.__name__
             child.id = child.function
 
-        if node.__class__.__name__ == 'If':
-            self.go_down_if_expression(node, child)
-            return
-        if node.__class__.__name__ == 'For':
-            self.go_down_for_expression(node, child)
-            return
-        if node.__class__.__name__ == 'While':
-            self.go_down_while_expression(node, child)
-            return
-        if node.__class__.__name__ == 'Call':
-            self.go_down_call_expression(node, child)
-            return
-        if node.__class__.__name__ == 'Lambda':
-            self.go_down_lambda_expression(node, child)
-            return
-        if node.__class__.__name__ == 'Assign':
-            self.go_down_assign_expression(node, child)
-            return
-        if node.__class__.__name__ == 'With':
-            self.process_with_op(node, child)
-            return
-        if node.__class__.__name__ == 'AugAssign':
-            self.go_down_aug_assign_expression(node, child)
-        if node.__class__.__name__ == 'BinOp':
-            self.go_down_bin_op(node, child)
-            return
-        if node.__class__.__name__ == 'UnaryOp':
-            self.go_down_unary_op(node, child)
-            return
-        if node.__class__.__name__ == 'Compare':
-            self.go_down_compare(node, child)
-            return
-        if node.__class__.__name__ == 'Num':
-            self.process_num_arg(node, child)
-            return
-        if node.__class__.__name__ == 'Str':
-            self.process_str_arg(node, child)
-            return
-        if node.__class__.__name__ == 'NameConstant':
-            self.process_name_const(node, child)
-            return
-        if node.__class__.__name__ == 'Attribute':
-            self.process_attribute(node, child)
-            return
-        if node.__class__.__name__ == 'Tuple':
-            self.process_tuple(node, child)
-            return
-        if node.__class__.__name__ == 'List':
-            self.process_list(node, child)
-            return
-        if node.__class__.__name__ == 'Raise':
-            self.process_raise(node, child)
-            return
-        if node.__class__.__name__ == 'Return':
-            self.process_return(node, child)
-            return
+        handlers = self.handlers_by_class.get(node_class)
+        if handlers is None:
+            handlers = self.get_class_handlers(node_class)
+        for handler in handlers:
+            handler(node, child)
+
+    def get_class_handlers(self, node_class: type) -> Tuple[Callable[[Any, BriefNode], None], ...]:
+        handler_list = self.expression_handlers.get(node_class.__name__, self.default_expression_handlers)
+        handlers = tuple([getattr(self, h) if isinstance(h, str) else partial(h, self)
+                          for h in handler_list])
+        self.handlers_by_class[node_class] = handlers
+        return handlers
 
+    @classmethod
+    def register_expression_handler(cls,
+                                    class_name: str,
+                                    *handlers: Union[str, Callable[['AstParser', Any, BriefNode], None]]) -> None:
+        # handlers are AstParser method names or functions (parser, node, child),
+        # called in the given order
+        cls.expression_handlers = dict(cls.expression_handlers)
+        cls.expression_handlers[class_name] = handlers
+
+    def process_node_id(self, node, child):
         if hasattr(node, 'id'):
             child.id = node.id
         return
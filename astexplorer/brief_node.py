@@ -1,5 +1,8 @@
 import hashlib
-from typing import List, Dict, Set, Optional, Tuple
+import struct
+import types
+from functools import lru_cache
+from typing import List, Dict, Set, Optional, Tuple, FrozenSet, Mapping, Callable
 
 # use original variable names like get_cartesian(bearing, distance)
 VAR_NAMES_ORIGINAL = 'orig'
@@ -10,15 +13,68 @@ VAR_NAMES_INDEX = 'index'
 VAR_NAMES_HASH = 'hash'
 
 
-def get_hash(s: str) -> str:
-    return hashlib.md5(s.encode('utf-8')).hexdigest()
+# how the digests are calculated (get_hash, combine_hashes, hash_node),
+# stored along with the digests: change it when the digests change
+HASH_SCHEME = 'blake2b64/2'
+
+
+# 64 bit blake2b: copying a blank hasher is cheaper than creating one
+_blank_hasher = hashlib.blake2b(digest_size=8)
+_unpack_digest = struct.Struct('<Q').unpack
+
+
+@lru_cache(maxsize=1 << 16)
+def get_hash(s: str) -> int:
+    # labels repeat a lot, hence the cache
+    hasher = _blank_hasher.copy()
+    hasher.update(s.encode('utf-8'))
+    return _unpack_digest(hasher.digest())[0]
+
+
+# { digests count: struct packing them }
+_digest_packers = {}  # type: Dict[int, Callable[..., bytes]]
+
+
+def get_digest_packer(count: int) -> Callable[..., bytes]:
+    pack = _digest_packers.get(count)
+    if pack is None:
+        pack = _digest_packers[count] = struct.Struct(f'<{count}Q').pack
+    return pack
+
+
+def combine_hashes(*hashes: int) -> int:
+    # order-sensitive mix of 64 bit digests: 64 bit blake2b of their
+    # little-endian bytes, the same for any Python version and platform
+    # (digests are stored in the parse cache and the index files)
+    hasher = _blank_hasher.copy()
+    hasher.update(get_digest_packer(len(hashes))(*hashes))
+    return _unpack_digest(hasher.digest())[0]
+
+
+def hash_node(label: str, hashes: List[int]) -> int:
+    # node's digest: a single blake2b over the count of the child digests,
+    # the digests themselves and then the node's label. Digests are 64 bit:
+    # for n distinct subtrees the chance of any two sharing a digest is about
+    # n^2 / 2^65 (~3e-6 for ten million subtrees), a collision would be
+    # reported as a (false) copypaste
+    hasher = _blank_hasher.copy()
+    hasher.update(get_digest_packer(len(hashes) + 1)(len(hashes), *hashes) + label.encode('utf-8'))
+    return _unpack_digest(hasher.digest())[0]
+
+
+@lru_cache(maxsize=1 << 16)
+def hash_leaf_node(label: str, depth: int) -> int:
+    # leaves (names, constants) repeat a lot, hence the cache
+    return hash_node(label, [depth])
 
 
 class BriefVariable:
+    __slots__ = ('name', 'block_index', 'usage_hash')
+
     def __init__(self, name: str):
         self.name = name
         self.block_index = ''
-        self.usage_hash = ''
+        self.usage_hash = 0
 
     def copy(self) -> 'BriefVariable':
         cpy = BriefVariable(self.name)
@@ -31,6 +87,8 @@ class BriefVariable:
 
 
 class BriefVariableSet:
+    __slots__ = ('variables', 'index_by_name')
+
     def __init__(self):
         self.variables = []  # type: List[BriefVariable]
         # { name: index in self.variables }
@@ -51,7 +109,55 @@ class BriefVariableSet:
             self.index_by_name[var.name] = len(self.variables) - 1
 
 
+class FrozenBriefVariableSet(BriefVariableSet):
+    # empty and read-only, see EMPTY_VARIABLES
+    __slots__ = ()
+
+    def __init__(self):
+        super().__init__()
+        self.variables = ()
+        self.index_by_name = types.MappingProxyType({})
+
+    def add_variable(self, name: str) -> None:
+        raise TypeError('compacted nodes\' variables can not be changed')
+
+    def update(self, subset: 'BriefVariableSet') -> None:
+        raise TypeError('compacted nodes\' variables can not be changed')
+
+    def __reduce__(self):
+        # unpickled as the same shared object
+        return 'EMPTY_VARIABLES'
+
+
+class FrozenBody(dict):
+    # empty and read-only, see EMPTY_BODY
+    __slots__ = ()
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError('compacted nodes\' body can not be changed')
+
+    __setitem__ = __delitem__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+    __ior__ = _read_only
+
+    def __reduce__(self):
+        # unpickled as the same shared object
+        return 'EMPTY_BODY'
+
+
+# shared by all compacted nodes (see FuncTree.compact) instead of
+# per-node empty containers, read-only
+EMPTY_VARIABLES = FrozenBriefVariableSet()
+EMPTY_NODE_LIST = ()  # type: Tuple[BriefNode, ...]
+EMPTY_BODY = FrozenBody()  # type: Mapping[str, List[BriefNode]]
+EMPTY_NAMES = frozenset()  # type: FrozenSet[str]
+
+
 class BriefNode:
+    __slots__ = ('function', 'arguments', 'body', 'id', 'instance', 'weight', 'depth',
+                 'orig_hash', 'index_hash', 'usage_hash', 'line_start', 'line_end',
+                 'variables', 'mutating_variables')
+
     compare_op_symbols = {'Lt': '<', 'Gt': '>', 'Eq': '==', 'NotEq': '!==',
                           'LtE': '<=', 'GtE': '>=',
                           'In': 'in', 'NotIn': 'not in', 'Is': 'is', 'IsNot': 'is not'}
@@ -68,10 +174,11 @@ class BriefNode:
         self.instance = None
         self.weight = 0
         self.depth = 0
-        # FuncTree recursively calculates hash for each node
-        self.hash_by_type = {VAR_NAMES_ORIGINAL: '',
-                             VAR_NAMES_INDEX: '',
-                             VAR_NAMES_HASH: '' }
+        # FuncTree recursively calculates hash for each node:
+        # VAR_NAMES_ORIGINAL, VAR_NAMES_INDEX and VAR_NAMES_HASH hashes
+        self.orig_hash = 0
+        self.index_hash = 0
+        self.usage_hash = 0
         if loc is not None:
             self.line_start = loc[0]
             self.line_end = loc[1]
@@ -89,6 +196,33 @@ class BriefNode:
     def __str__(self):
         return self.stringify(self)
 
+    @property
+    def hash_by_type(self) -> Mapping[str, int]:
+        # read-only: use set_hash_by_type() or assign the whole dict
+        return types.MappingProxyType({VAR_NAMES_ORIGINAL: self.orig_hash,
+                                       VAR_NAMES_INDEX: self.index_hash,
+                                       VAR_NAMES_HASH: self.usage_hash})
+
+    @hash_by_type.setter
+    def hash_by_type(self, hashes: Dict[str, int]) -> None:
+        for var_names, node_hash in hashes.items():
+            self.set_hash_by_type(var_names, node_hash)
+
+    def get_hash_by_type(self, var_names: str) -> int:
+        if var_names == VAR_NAMES_INDEX:
+            return self.index_hash
+        if var_names == VAR_NAMES_HASH:
+            return self.usage_hash
+        return self.orig_hash
+
+    def set_hash_by_type(self, var_names: str, node_hash: int) -> None:
+        if var_names == VAR_NAMES_INDEX:
+            self.index_hash = node_hash
+        elif var_names == VAR_NAMES_HASH:
+            self.usage_hash = node_hash
+        else:
+            self.orig_hash = node_hash
+
     def stringify_subtree(self, sstr: str, indent: int):
         pads = ' ' * (indent * 4)
         sstr += pads
@@ -122,7 +256,16 @@ class BriefNode:
             return orig_name
         if uniform_var_names == VAR_NAMES_INDEX:
             return var.block_index
-        return var.usage_hash
+        return f'{var.usage_hash:x}'
+
+    def get_label(self, var_names_source: str = VAR_NAMES_ORIGINAL) -> str:
+        # node's own label, without its arguments and body
+        if self.function == 'Name' or self.function == 'NameConstant':
+            return self.get_variable_name(self, var_names_source)
+        if self.function == 'Str':
+            return "#str'" + self.id + "'"
+        inst_preffix = self.instance + '.' if self.instance is not None else ''
+        return self.function + ' ' + inst_preffix + self.id
 
     def stringify_expression(self,
                              node: 'BriefNode',
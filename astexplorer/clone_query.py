@@ -0,0 +1,170 @@
+# find the copies of a code snippet in a prebuilt hash index file.
+# Run from the repository root:
+#   python -m astexplorer.clone_query build index.bin folder [folder ...]
+#   python -m astexplorer.clone_query query index.bin --file path.py --lines 10-20
+#   python -m astexplorer.clone_query query index.bin < snippet.py
+import argparse
+import codecs
+import os
+import sys
+import textwrap
+from typing import List, Optional
+
+from astexplorer.ast_comparer import AstComparer
+from astexplorer.ast_parser import AstParser, FileLines
+from astexplorer.func_tree import FuncTree
+from astexplorer.hash_index_file import HashIndexFile, write_index_file, NO_STATEMENT
+
+SNIPPET_FUNCTION = '__snippet__'
+
+
+class CloneMatch:
+    __slots__ = ('file', 'function', 'start_index', 'end_index', 'count', 'weight')
+
+    def __init__(self, file: str, function: str, start_index: int, end_index: int,
+                 count: int, weight: int):
+        self.file = file
+        self.function = function
+        # character indices in the file, as BriefNode.line_start / line_end
+        self.start_index = start_index
+        self.end_index = end_index
+        self.count = count
+        self.weight = weight
+
+    def __str__(self):
+        return f'{self.file}: {self.function} [{self.start_index}, {self.end_index}], ' \
+               f'{self.count} statements, {self.weight} weight'
+
+    def __repr__(self):
+        return self.__str__()
+
+
+class CloneQuery:
+    # looks statement sequences up in a HashIndexFile: a match is a run of
+    # statements in one statement list with the same VAR_NAMES_INDEX hashes
+    def __init__(self, index: HashIndexFile):
+        self.index = index
+
+    def find_snippet(self, snippet: str) -> List[CloneMatch]:
+        # the snippet is one or more statements, parsed as a function's body
+        source = f'def {SNIPPET_FUNCTION}():\n' + textwrap.indent(textwrap.dedent(snippet), '    ')
+        functions = AstParser().parse_string(source, SNIPPET_FUNCTION)
+        if not functions or not functions[0].children:
+            return []
+        return self.find_function_body(functions[0])
+
+    def find_lines(self, file_path: str, first_line: int, last_line: int) -> List[CloneMatch]:
+        # lines are 1-based, inclusive
+        with codecs.open(file_path, 'r', encoding='utf-8') as fr:
+            lines = fr.read().splitlines(keepends=True)
+        return self.find_snippet(''.join(lines[first_line - 1: last_line]))
+
+    def find_function_body(self, func: FuncTree) -> List[CloneMatch]:
+        AstComparer().compare_pre_process_functions([func])
+        return self.find_statements([c.index_hash for c in func.children])
+
+    def find_statements(self, hashes: List[int]) -> List[CloneMatch]:
+        matches = []  # type: List[CloneMatch]
+        if not hashes:
+            return matches
+        for first in self.index.find_statements(hashes[0]):
+            last = self.match_statements(first, hashes)
+            if last is None:
+                continue
+            weight = 0
+            statement = first
+            while True:
+                weight += self.index.statement_weights[statement]
+                if statement == last:
+                    break
+                statement = self.index.statement_next[statement]
+            file, function, _, _ = self.index.get_function(self.index.statement_functions[first])
+            matches.append(CloneMatch(file, function,
+                                      self.index.statement_line_starts[first],
+                                      self.index.statement_line_ends[last],
+                                      len(hashes), weight))
+        matches.sort(key=lambda m: (m.file, m.start_index))
+        return matches
+
+    def match_statements(self, first: int, hashes: List[int]) -> Optional[int]:
+        # the last statement of the run starting at "first", if the run matches
+        statement = first
+        for i in range(1, len(hashes)):
+            statement = self.index.statement_next[statement]
+            if statement == NO_STATEMENT or self.index.statement_hashes[statement] != hashes[i]:
+                return None
+        return statement
+
+
+def build_index(index_path: str, folders: List[str]) -> int:
+    functions = []  # type: List[FuncTree]
+    for folder in folders:
+        for root, _, files in os.walk(folder):
+            for file in sorted(files):
+                if not file.endswith('.py'):
+                    continue
+                file_path = os.path.join(root, file)
+                try:
+                    functions += AstParser().parse_module(file_path)
+                except Exception as e:
+                    print(f'Error parsing "{file_path}": {e}', file=sys.stderr)
+    AstComparer().compare_pre_process_functions(functions)
+    write_index_file(index_path, functions)
+    return len(functions)
+
+
+def print_matches(matches: List[CloneMatch]) -> None:
+    # file:line, line numbers are read from the files found
+    file_lines = {}
+    for m in matches:
+        if m.file not in file_lines:
+            try:
+                with codecs.open(m.file, 'r', encoding='utf-8') as fr:
+                    file_lines[m.file] = FileLines(fr.read())
+            except OSError:
+                file_lines[m.file] = None
+        lines = file_lines[m.file]
+        if lines is None:
+            print(m)
+            continue
+        print(f'{m.file}:{lines.get_line_number(m.start_index)}-{lines.get_line_number(m.end_index)}: '
+              f'{m.function}, {m.count} statements, {m.weight} weight')
+
+
+def main(args: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Find copies of a code snippet')
+    commands = parser.add_subparsers(dest='command', required=True)
+    build_parser = commands.add_parser('build', help='build the index file')
+    build_parser.add_argument('index')
+    build_parser.add_argument('folders', nargs='+')
+    query_parser = commands.add_parser('query', help='find the snippet (from stdin or --file)')
+    query_parser.add_argument('index')
+    query_parser.add_argument('--file')
+    query_parser.add_argument('--lines', help='first-last, 1-based')
+    options = parser.parse_args(args)
+
+    if options.command == 'build':
+        count = build_index(options.index, options.folders)
+        print(f'{count} functions are indexed')
+        return 0
+
+    # a broken or outdated index, a malformed --lines value or a range
+    # cutting a statement in half are reported as usage errors
+    try:
+        with HashIndexFile(options.index) as index:
+            query = CloneQuery(index)
+            if options.file:
+                first, _, last = (options.lines or '1-1000000000').partition('-')
+                matches = query.find_lines(options.file, int(first), int(last or first))
+            else:
+                matches = query.find_snippet(sys.stdin.read())
+            print_matches(matches)
+    except SyntaxError as e:
+        query_parser.error(f'the snippet is not a complete statement list: {e.msg}, line {e.lineno}')
+    except ValueError as e:
+        query_parser.error(str(e))
+    return 0 if matches else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -3,6 +3,9 @@ from astexplorer.func_tree import FuncTree
 
 
 class Copypaste:
+    __slots__ = ('func_a', 'func_b', 'node_a', 'node_b', 'count', 'weight',
+                 'src_line', 'start_index_a', 'end_index_a')
+
     def __init__(self, func_a: FuncTree, func_b: FuncTree,
                  node_a: BriefNode, node_b: BriefNode):
         self.func_a = func_a
@@ -1,12 +1,19 @@
 from typing import List, Dict
 
 from astexplorer.brief_node import BriefNode, \
-    VAR_NAMES_INDEX, VAR_NAMES_HASH, get_hash
+    VAR_NAMES_INDEX, VAR_NAMES_HASH, get_hash, combine_hashes, hash_node, hash_leaf_node, \
+    EMPTY_VARIABLES, EMPTY_NODE_LIST, EMPTY_BODY, EMPTY_NAMES
 
 
 class FuncTree:
     default_node_weight = 10
 
+    # mixed into the node's hash before (non-empty) arguments and
+    # variable indices, so that child hashes in different roles differ
+    # (body lists start with their key's hash)
+    ARGUMENTS_HASH_SEED = get_hash('arguments')
+    VARIABLES_HASH_SEED = get_hash('variables')
+
     weight_by_function = {'Attribute': 1, 'Name': 1, 'Num': 1, 'NameConstant': 1, 'Str': 1, 'Tuple': 5}
 
     def __init__(self, name: str):
@@ -35,29 +42,55 @@ class FuncTree:
 
     def calc_hash(self,
                   child: BriefNode,
-                  var_names: str) -> str:
-        hash_src = child.stringify(child, var_names)
+                  var_names: str) -> int:
+        # Merkle hash: node's own label plus its depth and children's
+        # digests, so each subtree is serialized only once
+        if not child.body and not child.arguments:
+            node_hash = hash_leaf_node(child.get_label(var_names), child.depth)
+            child.set_hash_by_type(var_names, node_hash)
+            return node_hash
+        hash_src = [child.depth]
         # plus body items
-        for key in child.body:
-            for sub in child.body[key]:
-                hash_src += self.calc_hash(sub, var_names)
+        for key, sub_list in child.body.items():
+            hash_src.append(get_hash(key))
+            self.append_children_hashes(child, sub_list, var_names, hash_src)
         # plus arguments
-        for arg in child.arguments:
-            hash_src += self.calc_hash(arg, var_names)
-
-        child.hash_by_type[var_names] = get_hash(hash_src)
-        return child.hash_by_type[var_names]
+        if child.arguments:
+            hash_src.append(FuncTree.ARGUMENTS_HASH_SEED)
+            self.append_children_hashes(child, child.arguments, var_names, hash_src)
+
+        node_hash = hash_node(child.get_label(var_names), hash_src)
+        child.set_hash_by_type(var_names, node_hash)
+        return node_hash
+
+    def append_children_hashes(self,
+                               parent: BriefNode,
+                               children: List[BriefNode],
+                               var_names: str,
+                               hash_src: List[int]) -> None:
+        if var_names != VAR_NAMES_INDEX:
+            for child in children:
+                hash_src.append(self.calc_hash(child, var_names))
+            return
+        # child's variable indices are local to the child's subtree,
+        # map them to the parent's indices: "x = a * a" vs "x = a * b"
+        var_indices = parent.variables.index_by_name
+        for child in children:
+            hash_src.append(self.calc_hash(child, var_names))
+            if child.variables.variables:
+                hash_src.append(FuncTree.VARIABLES_HASH_SEED)
+                hash_src.extend([var_indices[v.name] for v in child.variables.variables])
 
     def hashify_variables(self):
         # calculate hashes for all variables
-        var_hashes = {}  # Dict[str, str]
+        var_hashes = {}  # Dict[str, int]
         for child in self.children:
             self.calc_and_sum_hashes(child, var_hashes)
         # propagate variable hashes from top to bottom
         for child in self.children:
             self.propagate_var_hashes_down(child, var_hashes)
 
-    def propagate_var_hashes_down(self, node: BriefNode, var_hashes: Dict[str, str]):
+    def propagate_var_hashes_down(self, node: BriefNode, var_hashes: Dict[str, int]):
         for var in node.variables.variables:
             var.usage_hash = var_hashes.get(var.name)
         for key in node.body:
@@ -66,8 +99,8 @@ class FuncTree:
         for child in node.arguments:
             self.propagate_var_hashes_down(child, var_hashes)
 
-    def calculate_variable_hashes(self, node: BriefNode) -> Dict[str, str]:
-        var_hashes = {}  # Dict[str, str]
+    def calculate_variable_hashes(self, node: BriefNode) -> Dict[str, int]:
+        var_hashes = {}  # Dict[str, int]
         for key in node.body:
             for child in node.body[key]:
                 self.calc_and_sum_hashes(child, var_hashes)
@@ -76,22 +109,22 @@ class FuncTree:
         # add own variable hashes
         for i in range(len(node.variables.variables)):
             var = node.variables.variables[i]
-            var_hash = node.hash_by_type[VAR_NAMES_INDEX] + str(i)
+            var_hash = combine_hashes(node.index_hash, i)
             if var.name not in var_hashes \
                     or var.name not in node.mutating_variables:
                 var_hashes[var.name] = var_hash
             else:
-                var_hashes[var.name] = get_hash(var_hash + var_hashes[var.name])
+                var_hashes[var.name] = combine_hashes(var_hash, var_hashes[var.name])
             var.usage_hash = var_hashes[var.name]
         return var_hashes
 
-    def calc_and_sum_hashes(self, node: BriefNode, var_hashes: Dict[str, str]):
+    def calc_and_sum_hashes(self, node: BriefNode, var_hashes: Dict[str, int]):
         sub_hashes = self.calculate_variable_hashes(node)
         for var_name in sub_hashes:
             if var_name not in var_hashes:
                 var_hashes[var_name] = sub_hashes[var_name]
             else:
-                var_hashes[var_name] = get_hash(var_hashes[var_name] + sub_hashes[var_name])
+                var_hashes[var_name] = combine_hashes(var_hashes[var_name], sub_hashes[var_name])
 
     def weight_tree(self) -> None:
         # give weight to each node, recursively
@@ -122,6 +155,26 @@ class FuncTree:
         child.depth = max_depth
         return [child.weight, max_depth + 1]
 
+    # drop variables' data needed only to calculate hashes and share
+    # empty containers: the tree gets lighter to keep in memory and
+    # to pass between processes, but should not be modified afterwards
+    def compact(self) -> None:
+        for child in self.children:
+            self.compact_node(child)
+
+    def compact_node(self, node: BriefNode) -> None:
+        node.variables = EMPTY_VARIABLES
+        node.mutating_variables = EMPTY_NAMES
+        for arg in node.arguments:
+            self.compact_node(arg)
+        for child_list in node.body.values():
+            for child in child_list:
+                self.compact_node(child)
+        if not node.arguments:
+            node.arguments = EMPTY_NODE_LIST
+        if not node.body:
+            node.body = EMPTY_BODY
+
     # make parameter names, e.g. (self, folder, mode) "minimized"
     # e.q. (self, #p1, #p2)
     def rename_ptrs(self):
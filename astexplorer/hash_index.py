@@ -0,0 +1,82 @@
+from typing import List, Dict, Iterable, Tuple, Optional, Set
+
+from astexplorer.brief_node import BriefNode
+from astexplorer.func_tree import FuncTree
+
+
+class StatementHashIndex:
+    # inverted index: statement hash -> keys of the functions
+    # containing the statement. AstComparer only compares function pairs
+    # that share at least one statement hash
+    def __init__(self):
+        # { VAR_NAMES_INDEX hash: [function key, ...] }, keys are ascending
+        self.functions_by_hash = {}  # type: Dict[int, List[int]]
+        self.hashes_by_function = {}  # type: Dict[int, List[int]]
+        # function keys are given in the order the functions are added
+        self.functions = {}  # type: Dict[int, FuncTree]
+        self.key_by_function = {}  # type: Dict[int, int]
+        self.next_key = 0
+
+    def build(self, functions: List[FuncTree]) -> None:
+        # the functions' keys are their indices in the list
+        self.functions_by_hash = {}
+        self.hashes_by_function = {}
+        self.functions = {}
+        self.key_by_function = {}
+        self.next_key = 0
+        for func in functions:
+            self.add_function(func)
+
+    def add_function(self, func: FuncTree) -> int:
+        key = self.next_key
+        self.next_key += 1
+        hashes = list({n.index_hash: 1
+                       for n in self.iterate_statements(func.children)})
+        self.functions[key] = func
+        self.key_by_function[id(func)] = key
+        self.hashes_by_function[key] = hashes
+        for h in hashes:
+            self.functions_by_hash.setdefault(h, []).append(key)
+        return key
+
+    def remove_function(self, func: FuncTree) -> int:
+        key = self.key_by_function.pop(id(func))
+        del self.functions[key]
+        for h in self.hashes_by_function.pop(key):
+            bucket = self.functions_by_hash[h]
+            bucket.remove(key)
+            if not bucket:
+                del self.functions_by_hash[h]
+        return key
+
+    def get_key(self, func: FuncTree) -> Optional[int]:
+        return self.key_by_function.get(id(func))
+
+    def find_partners(self, key: int) -> Set[int]:
+        # keys of the other functions sharing a statement hash with the function
+        partners = set()
+        for h in self.hashes_by_function[key]:
+            bucket = self.functions_by_hash[h]
+            if len(bucket) < 2:
+                continue
+            partners.update(bucket)
+        partners.discard(key)
+        return partners
+
+    def find_candidate_pairs(self) -> Iterable[Tuple[int, int]]:
+        # yields (key A, key B), A < B, in the same order as the all-pairs loop does
+        for i in sorted(self.functions):
+            for j in sorted(self.find_partners(i)):
+                if j > i:
+                    yield i, j
+
+    @classmethod
+    def iterate_statements(cls, nodes: List[BriefNode]) -> Iterable[BriefNode]:
+        # the nodes AstComparer.find_node_copypastes may compare:
+        # function's children and (recursively) their "" bodies
+        stack = list(reversed(nodes))
+        while stack:
+            node = stack.pop()
+            yield node
+            if "" in node.body:
+                stack.extend(reversed(node.body[""]))
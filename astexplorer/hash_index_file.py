@@ -0,0 +1,222 @@
+import mmap
+import struct
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import List, Tuple, Dict, Iterable
+
+from astexplorer.brief_node import BriefNode, HASH_SCHEME
+from astexplorer.func_tree import FuncTree
+
+# binary file with the functions' statement hashes and weights, built once
+# and read by many processes via mmap without parsing the sources again.
+# Little-endian, all sections are 8 byte aligned:
+#   header: magic, version, the hashes' scheme and Python version (the digests
+#       depend on the ast module's trees), counts, section offsets and sizes
+#   string offsets (Q, string_count + 1), string data (utf-8)
+#   functions (I, FUNCTION_FIELDS per function)
+#   statements: hashes (Q), weights, line starts, line ends (including the
+#       nested statements), function indices, next statements in the same list (I)
+#   sorted hashes (Q) and their statement indices (I), for lookups by hash
+INDEX_FILE_MAGIC = b'CPNIDX\0\0'
+INDEX_FILE_VERSION = 3
+
+# magic, version, hash scheme, Python major and minor version,
+# function count, statement count, string count
+HEADER_FORMAT = '<8sI16sHHIQI'
+SECTIONS = ['string_offsets', 'string_data', 'functions',
+            'statement_hashes', 'statement_weights', 'statement_line_starts',
+            'statement_line_ends', 'statement_functions', 'statement_next',
+            'sorted_hashes', 'sorted_statements']
+SECTION_TYPES = {'string_offsets': 'Q', 'string_data': 'B', 'functions': 'I',
+                 'statement_hashes': 'Q', 'statement_weights': 'I',
+                 'statement_line_starts': 'I', 'statement_line_ends': 'I',
+                 'statement_functions': 'I', 'statement_next': 'I',
+                 'sorted_hashes': 'Q', 'sorted_statements': 'I'}
+# (offset, size) of each section
+SECTION_TABLE_FORMAT = '<' + 'QQ' * len(SECTIONS)
+
+# functions' fields: file and name (string indices), span,
+# the first statement's index and the statements' count
+FUNCTION_FIELDS = 6
+FUNCTION_FILE, FUNCTION_NAME, FUNCTION_START, FUNCTION_END, \
+    FUNCTION_FIRST_STATEMENT, FUNCTION_STATEMENTS = range(FUNCTION_FIELDS)
+
+# statement_next value for the last statement in a list
+NO_STATEMENT = 0xFFFFFFFF
+
+
+def align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+def write_index_file(file_path: str, functions: List[FuncTree]) -> None:
+    # functions should be hashed (see AstComparer.compare_pre_process_functions)
+    strings = []  # type: List[str]
+    string_ids = {}  # type: Dict[str, int]
+
+    def get_string_id(s: str) -> int:
+        if s not in string_ids:
+            string_ids[s] = len(strings)
+            strings.append(s)
+        return string_ids[s]
+
+    sections = {name: array(SECTION_TYPES[name]) for name in SECTIONS}
+
+    def add_statements(func_index: int, nodes: List[BriefNode]) -> int:
+        # in StatementHashIndex.iterate_statements() order, returns the end
+        # of the last statement including its nested statements
+        previous = NO_STATEMENT
+        end = 0
+        for node in nodes:
+            index = len(sections['statement_hashes'])
+            sections['statement_hashes'].append(node.index_hash)
+            sections['statement_weights'].append(node.weight)
+            sections['statement_line_starts'].append(node.line_start)
+            sections['statement_line_ends'].append(node.line_end)
+            sections['statement_functions'].append(func_index)
+            sections['statement_next'].append(NO_STATEMENT)
+            if previous != NO_STATEMENT:
+                sections['statement_next'][previous] = index
+            previous = index
+            end = node.line_end
+            if "" in node.body:
+                end = max(end, add_statements(func_index, node.body[""]))
+                sections['statement_line_ends'][index] = end
+        return end
+
+    for func_index, func in enumerate(functions):
+        first_statement = len(sections['statement_hashes'])
+        add_statements(func_index, func.children)
+        sections['functions'].extend([
+            get_string_id(func.file), get_string_id(func.name),
+            min((n.line_start for n in func.children), default=0),
+            max((n.line_end for n in func.children), default=0),
+            first_statement, len(sections['statement_hashes']) - first_statement])
+
+    string_data = [s.encode('utf-8') for s in strings]
+    offset = 0
+    for data in string_data:
+        sections['string_offsets'].append(offset)
+        offset += len(data)
+    sections['string_offsets'].append(offset)
+    sections['string_data'] = array('B', b''.join(string_data))
+
+    hashes = sections['statement_hashes']
+    order = sorted(range(len(hashes)), key=hashes.__getitem__)
+    sections['sorted_hashes'] = array('Q', [hashes[i] for i in order])
+    sections['sorted_statements'] = array('I', order)
+
+    header = struct.pack(HEADER_FORMAT, INDEX_FILE_MAGIC, INDEX_FILE_VERSION,
+                         HASH_SCHEME.encode('ascii'), sys.version_info[0], sys.version_info[1],
+                         len(functions), len(hashes), len(strings))
+    offset = align(len(header) + struct.calcsize(SECTION_TABLE_FORMAT))
+    section_table = []
+    for name in SECTIONS:
+        size = len(sections[name]) * sections[name].itemsize
+        section_table += [offset, size]
+        offset = align(offset + size)
+
+    with open(file_path, 'wb') as fw:
+        fw.write(header)
+        fw.write(struct.pack(SECTION_TABLE_FORMAT, *section_table))
+        for i, name in enumerate(SECTIONS):
+            fw.write(b'\0' * (section_table[i * 2] - fw.tell()))
+            data = sections[name]
+            if sys.byteorder != 'little':
+                data.byteswap()
+            fw.write(data.tobytes())
+
+
+class HashIndexFile:
+    # read-only view of a write_index_file() file: the sections are
+    # memoryviews over the mapped file, nothing is copied or parsed
+    def __init__(self, file_path: str):
+        if sys.byteorder != 'little':
+            raise ValueError('index files can only be mapped on little-endian machines')
+        self.file_path = file_path
+        with open(file_path, 'rb') as fr:
+            self.mmap = mmap.mmap(fr.fileno(), 0, access=mmap.ACCESS_READ)
+        self.buffer = memoryview(self.mmap)
+        if len(self.buffer) < struct.calcsize(HEADER_FORMAT) + struct.calcsize(SECTION_TABLE_FORMAT):
+            self.close()
+            raise ValueError(f'"{file_path}" is not a version {INDEX_FILE_VERSION} index file')
+        magic, version, hash_scheme, python_major, python_minor, \
+            self.function_count, self.statement_count, self.string_count = \
+            struct.unpack_from(HEADER_FORMAT, self.buffer)
+        if magic != INDEX_FILE_MAGIC or version != INDEX_FILE_VERSION:
+            self.close()
+            raise ValueError(f'"{file_path}" is not a version {INDEX_FILE_VERSION} index file')
+        # the hashes built another way can't be compared, nothing would be found
+        hash_scheme = hash_scheme.rstrip(b'\0').decode('ascii', 'replace')
+        if hash_scheme != HASH_SCHEME or (python_major, python_minor) != sys.version_info[:2]:
+            self.close()
+            raise ValueError(f'"{file_path}" hashes are built with the "{hash_scheme}" scheme '
+                             f'on Python {python_major}.{python_minor}, expected "{HASH_SCHEME}" '
+                             f'on Python {sys.version_info[0]}.{sys.version_info[1]}: '
+                             f'build the index again')
+        section_table = struct.unpack_from(SECTION_TABLE_FORMAT, self.buffer,
+                                           struct.calcsize(HEADER_FORMAT))
+        self.sections = {}  # type: Dict[str, memoryview]
+        for i, name in enumerate(SECTIONS):
+            offset, size = section_table[i * 2], section_table[i * 2 + 1]
+            self.sections[name] = self.buffer[offset: offset + size].cast(SECTION_TYPES[name])
+        self.functions = self.sections['functions']
+        self.statement_hashes = self.sections['statement_hashes']
+        self.statement_weights = self.sections['statement_weights']
+        self.statement_line_starts = self.sections['statement_line_starts']
+        self.statement_line_ends = self.sections['statement_line_ends']
+        self.statement_functions = self.sections['statement_functions']
+        self.statement_next = self.sections['statement_next']
+        self.sorted_hashes = self.sections['sorted_hashes']
+        self.sorted_statements = self.sections['sorted_statements']
+
+    def __enter__(self) -> 'HashIndexFile':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self) -> None:
+        if self.mmap is None:
+            return
+        # the views should be released before the map is closed
+        for view in getattr(self, 'sections', {}).values():
+            view.release()
+        self.sections = {}
+        self.buffer.release()
+        try:
+            self.mmap.close()
+        except BufferError:
+            # the caller still holds slices, the map is closed when they are released
+            pass
+        self.mmap = None
+
+    def get_string(self, index: int) -> str:
+        offsets = self.sections['string_offsets']
+        return bytes(self.sections['string_data'][offsets[index]: offsets[index + 1]]).decode('utf-8')
+
+    def get_function(self, index: int) -> Tuple[str, str, int, int]:
+        # file, name, span
+        fields = self.functions[index * FUNCTION_FIELDS: (index + 1) * FUNCTION_FIELDS]
+        return self.get_string(fields[FUNCTION_FILE]), self.get_string(fields[FUNCTION_NAME]), \
+            fields[FUNCTION_START], fields[FUNCTION_END]
+
+    def get_statement_range(self, function_index: int) -> range:
+        first = self.functions[function_index * FUNCTION_FIELDS + FUNCTION_FIRST_STATEMENT]
+        count = self.functions[function_index * FUNCTION_FIELDS + FUNCTION_STATEMENTS]
+        return range(first, first + count)
+
+    def get_statement_hashes(self, function_index: int) -> memoryview:
+        r = self.get_statement_range(function_index)
+        return self.statement_hashes[r.start: r.stop]
+
+    def get_statement_weights(self, function_index: int) -> memoryview:
+        r = self.get_statement_range(function_index)
+        return self.statement_weights[r.start: r.stop]
+
+    def find_statements(self, statement_hash: int) -> Iterable[int]:
+        # indices of the statements with the hash, binary search
+        start = bisect_left(self.sorted_hashes, statement_hash)
+        end = bisect_right(self.sorted_hashes, statement_hash, start)
+        return self.sorted_statements[start: end]
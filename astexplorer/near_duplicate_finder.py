@@ -0,0 +1,99 @@
+import random
+from typing import List, Dict, Tuple, Set, Iterable
+
+from astexplorer.brief_node import BriefNode
+from astexplorer.func_tree import FuncTree
+
+# Mersenne prime 2^61 - 1, the modulus of the MinHash permutations
+MINHASH_PRIME = (1 << 61) - 1
+
+
+class NearDuplicate:
+    __slots__ = ('func_a', 'func_b', 'similarity')
+
+    def __init__(self, func_a: FuncTree, func_b: FuncTree, similarity: float):
+        self.func_a = func_a
+        self.func_b = func_b
+        # Jaccard similarity of the functions' subtree hash sets
+        self.similarity = similarity
+
+    def __str__(self):
+        s = f'{self.similarity:.2f} similarity.\n'
+        s += 'Files: [' + self.func_a.file + ', ' + self.func_b.file + ']\n'
+        s += 'Functions: [' + str(self.func_a) + ', ' + str(self.func_b) + ']'
+        return s
+
+    def __repr__(self):
+        return self.__str__()
+
+
+class NearDuplicateFinder:
+    # finds function pairs sharing most of their subtrees, even if
+    # some statements are edited. Each function is a set of its subtrees'
+    # VAR_NAMES_INDEX hashes, the set's MinHash signature is split into bands,
+    # and only the functions falling into the same bucket for some band are compared.
+    # More bands (fewer rows in each) - better recall, more pairs to compare
+    def __init__(self, num_perm: int = 128, bands: int = 32, threshold: float = 0.8):
+        if num_perm % bands:
+            raise ValueError(f'num_perm ({num_perm}) should be divisible by bands ({bands})')
+        self.num_perm = num_perm
+        self.bands = bands
+        self.threshold = threshold
+        # smaller functions are too common to be reported
+        self.min_subtrees = 10
+        self.seed = 1
+        rnd = random.Random(self.seed)
+        self.permutations = [(rnd.randrange(1, MINHASH_PRIME), rnd.randrange(0, MINHASH_PRIME))
+                             for _ in range(num_perm)]  # type: List[Tuple[int, int]]
+        self.near_duplicates = []  # type: List[NearDuplicate]
+
+    def find_near_duplicates(self, functions: List[FuncTree]) -> List[NearDuplicate]:
+        self.near_duplicates = []
+        subtrees = [self.get_subtree_hashes(f) for f in functions]
+        rows = self.num_perm // self.bands
+        # { (band, band's signature part): [function index, ...] }
+        buckets = {}  # type: Dict[Tuple[int, Tuple[int, ...]], List[int]]
+        for i, hashes in enumerate(subtrees):
+            if len(hashes) < self.min_subtrees:
+                continue
+            signature = self.get_signature(hashes)
+            for band in range(self.bands):
+                key = (band, tuple(signature[band * rows: (band + 1) * rows]))
+                buckets.setdefault(key, []).append(i)
+
+        compared = set()  # type: Set[Tuple[int, int]]
+        for bucket in buckets.values():
+            for a in range(len(bucket)):
+                for b in range(a + 1, len(bucket)):
+                    pair = (bucket[a], bucket[b])
+                    if pair in compared:
+                        continue
+                    compared.add(pair)
+                    # the signatures only nominate the candidates, the similarity is exact
+                    hashes_a, hashes_b = subtrees[pair[0]], subtrees[pair[1]]
+                    similarity = len(hashes_a & hashes_b) / len(hashes_a | hashes_b)
+                    if similarity >= self.threshold:
+                        self.near_duplicates.append(
+                            NearDuplicate(functions[pair[0]], functions[pair[1]], similarity))
+
+        self.near_duplicates.sort(key=lambda d: -d.similarity)
+        return self.near_duplicates
+
+    def get_signature(self, hashes: Set[int]) -> List[int]:
+        return [min((a * h + b) % MINHASH_PRIME for h in hashes)
+                for a, b in self.permutations]
+
+    @classmethod
+    def get_subtree_hashes(cls, func: FuncTree) -> Set[int]:
+        return {n.index_hash for n in cls.iterate_subtrees(func.children)}
+
+    @classmethod
+    def iterate_subtrees(cls, nodes: Iterable[BriefNode]) -> Iterable[BriefNode]:
+        # all the nodes: bodies' statements and arguments
+        stack = list(nodes)
+        while stack:
+            node = stack.pop()
+            yield node
+            for key in node.body:
+                stack.extend(node.body[key])
+            stack.extend(node.arguments)
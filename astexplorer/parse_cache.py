@@ -0,0 +1,100 @@
+import hashlib
+import os
+import pickle
+import sys
+from typing import List, Optional
+
+from astexplorer.func_tree import FuncTree
+
+# bump when parsing, hashing or FuncTree / BriefNode layout changes
+CACHE_VERSION = '5'
+
+
+class ParseCache:
+    # pre-processed (hashed) functions of the parsed files, stored
+    # in a folder and keyed by the file content and the tool version
+    file_extension = '.pickle'
+
+    def __init__(self, folder: str, max_size: int = 512 * 1024 * 1024):
+        self.folder = folder
+        # total size of the cached entries, bytes
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(folder, exist_ok=True)
+
+    def get_key(self, data: bytes) -> str:
+        version = f'{CACHE_VERSION}:{sys.version_info[0]}.{sys.version_info[1]}:'
+        return hashlib.sha1(version.encode('utf-8') + data).hexdigest()
+
+    def get_entry_path(self, key: str) -> str:
+        return os.path.join(self.folder, key[:2], key + self.file_extension)
+
+    def load(self, key: str, file_path: str) -> Optional[List[FuncTree]]:
+        entry_path = self.get_entry_path(key)
+        try:
+            with open(entry_path, 'rb') as fr:
+                functions = pickle.load(fr)
+            if not isinstance(functions, list):
+                raise ValueError(f'unexpected cache entry type: {type(functions)}')
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception as e:
+            # corrupted or incompatible entry: drop it and parse the file again
+            print(f'Dropping cache entry "{entry_path}": {e}')
+            self.remove_entry(entry_path)
+            self.misses += 1
+            return None
+        # mark the entry as recently used
+        try:
+            os.utime(entry_path)
+        except OSError:
+            pass
+        # the same content may come from another file
+        for f in functions:
+            f.file = file_path
+        self.hits += 1
+        return functions
+
+    def store(self, key: str, functions: List[FuncTree]) -> None:
+        entry_path = self.get_entry_path(key)
+        os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+        # write and rename, so other processes never read a partial entry
+        temp_path = f'{entry_path}.{os.getpid()}.tmp'
+        try:
+            with open(temp_path, 'wb') as fw:
+                pickle.dump(functions, fw, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, entry_path)
+        except OSError as e:
+            print(f'Could not write cache entry "{entry_path}": {e}')
+            self.remove_entry(temp_path)
+
+    def trim(self) -> None:
+        # remove least recently used entries until the cache fits max_size
+        entries = []
+        total_size = 0
+        for sub_folder in os.scandir(self.folder):
+            if not sub_folder.is_dir():
+                continue
+            for entry in os.scandir(sub_folder.path):
+                if not entry.name.endswith(self.file_extension):
+                    continue
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total_size += stat.st_size
+        if total_size <= self.max_size:
+            return
+        entries.sort()
+        for _, size, entry_path in entries:
+            self.remove_entry(entry_path)
+            total_size -= size
+            if total_size <= self.max_size:
+                break
+
+    @classmethod
+    def remove_entry(cls, entry_path: str) -> None:
+        try:
+            os.remove(entry_path)
+        except OSError:
+            pass
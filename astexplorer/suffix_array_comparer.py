@@ -0,0 +1,140 @@
+from typing import List, Dict, Tuple
+
+from astexplorer.ast_comparer import AstComparer
+from astexplorer.brief_node import BriefNode
+from astexplorer.copypaste import Copypaste
+from astexplorer.func_tree import FuncTree
+
+
+def build_suffix_array(seq: List[int]) -> List[int]:
+    # prefix doubling: sort suffixes by their first k, 2k, 4k ... items
+    n = len(seq)
+    if n == 0:
+        return []
+    sa = sorted(range(n), key=lambda i: seq[i])
+    rank = [0] * n
+    for i in range(1, n):
+        rank[sa[i]] = rank[sa[i - 1]] + (seq[sa[i]] != seq[sa[i - 1]])
+    k = 1
+    while rank[sa[-1]] < n - 1:
+        key = [rank[i] * (n + 1) + (rank[i + k] + 1 if i + k < n else 0) for i in range(n)]
+        sa.sort(key=key.__getitem__)
+        new_rank = [0] * n
+        for i in range(1, n):
+            new_rank[sa[i]] = new_rank[sa[i - 1]] + (key[sa[i]] != key[sa[i - 1]])
+        rank = new_rank
+        k <<= 1
+    return sa
+
+
+def build_lcp_array(seq: List[int], sa: List[int]) -> List[int]:
+    # Kasai's algorithm: lcp[i] is the common prefix length of suffixes sa[i - 1] and sa[i]
+    n = len(seq)
+    rank = [0] * n
+    for i, s in enumerate(sa):
+        rank[s] = i
+    lcp = [0] * n
+    h = 0
+    for i in range(n):
+        if rank[i] == 0:
+            h = 0
+            continue
+        j = sa[rank[i] - 1]
+        while i + h < n and j + h < n and seq[i + h] == seq[j + h]:
+            h += 1
+        lcp[rank[i]] = h
+        if h > 0:
+            h -= 1
+    return lcp
+
+
+class SuffixArrayComparer(AstComparer):
+    # finds repeated statement runs across all the functions at once:
+    # each statement list (function's body and nested "" bodies) is written
+    # into one sequence of statement hash ids, delimited by unique separators,
+    # and the repeats are read from the sequence's suffix and LCP arrays
+    def __init__(self):
+        super().__init__()
+        self.min_cp_count = 2
+        # the groups of repeats bigger than that (a frequent statement run)
+        # give a copypaste for each repeat and the group's first one only,
+        # instead of a copypaste for each pair of repeats
+        self.max_pairwise_group = 16
+        self.sequence = []  # type: List[int]
+        # for each sequence item: (function index, statement list, index in the list),
+        # function index is -1 for separators
+        self.positions = []  # type: List[Tuple[int, List[BriefNode], int]]
+
+    def find_copypastes(self, functions: List[FuncTree]) -> List[Copypaste]:
+        self.functions = list(functions)
+        self.build_sequence(functions)
+        sa = build_suffix_array(self.sequence)
+        lcp = build_lcp_array(self.sequence, sa)
+
+        # suffixes sharing at least min_cp_count items are neighbours in the suffix array
+        start = 0
+        for i in range(1, len(sa) + 1):
+            if i < len(sa) and lcp[i] >= self.min_cp_count:
+                continue
+            if i - start > 1:
+                self.find_group_copypastes(sa, lcp, start, i)
+            start = i
+        self.filter_and_sort_copypastes()
+        return self.copypastes
+
+    def update_copypastes(self, functions: List[FuncTree]) -> List[Copypaste]:
+        # the suffix array is built over the whole corpus anyway
+        self.copypastes = []
+        return self.find_copypastes(functions)
+
+    def build_sequence(self, functions: List[FuncTree]) -> None:
+        # { statement hash: id }
+        hash_ids = {}  # type: Dict[int, int]
+        blocks = []  # type: List[Tuple[int, List[BriefNode]]]
+        for func_index, func in enumerate(functions):
+            blocks.append((func_index, func.children))
+            for node in self.index.iterate_statements(func.children):
+                if node.body.get(""):
+                    blocks.append((func_index, node.body[""]))
+
+        self.sequence = []
+        self.positions = []
+        for func_index, block in blocks:
+            for i, node in enumerate(block):
+                self.sequence.append(hash_ids.setdefault(node.index_hash, len(hash_ids)))
+                self.positions.append((func_index, block, i))
+            # separators are negative and unique, no repeat crosses a block's end
+            self.sequence.append(-len(self.positions) - 1)
+            self.positions.append((-1, block, len(block)))
+
+    def find_group_copypastes(self, sa: List[int], lcp: List[int], start: int, end: int) -> None:
+        # sa[start:end] suffixes share at least min_cp_count items, each pair's
+        # common run length is the minimal LCP between them
+        last = end if end - start <= self.max_pairwise_group else start + 1
+        for i in range(start, last):
+            run = len(self.sequence)
+            for j in range(i + 1, end):
+                run = min(run, lcp[j])
+                self.add_copypaste(sa[i], sa[j], run)
+
+    def add_copypaste(self, pos_a: int, pos_b: int, count: int) -> None:
+        func_a, block_a, index_a = self.positions[pos_a]
+        func_b, block_b, index_b = self.positions[pos_b]
+        if func_a == func_b:
+            return
+        # report only the runs that can't be extended to the left
+        if index_a > 0 and index_b > 0 and \
+                self.sequence[pos_a - 1] == self.sequence[pos_b - 1]:
+            return
+        if func_a > func_b:
+            func_a, block_a, index_a, func_b, block_b, index_b = \
+                func_b, block_b, index_b, func_a, block_a, index_a
+
+        cpy = Copypaste(self.functions[func_a], self.functions[func_b],
+                        block_a[index_a], block_b[index_b])
+        cpy.count = count
+        for i in range(index_a + 1, index_a + count):
+            cpy.update(block_a[i])
+        if cpy.weight < self.min_cp_weight:
+            return
+        self.copypastes.append(cpy)
@@ -1,5 +1,5 @@
 from datetime import date, time
-from typing import List, Any, Callable
+from typing import List, Any, Callable, Mapping
 
 
 class Sequence:
@@ -27,7 +27,18 @@ def serialize(obj):
         serial = obj.isoformat()
         return serial
 
-    return obj.__dict__
+    if hasattr(obj, '__dict__'):
+        return obj.__dict__
+
+    # classes with __slots__, including the base classes' slots
+    if hasattr(obj, '__slots__'):
+        return {s: getattr(obj, s) for cls in type(obj).__mro__
+                for s in getattr(cls, '__slots__', ())}
+
+    # read-only containers, e.g. compacted BriefNode.body and mutating_variables
+    if isinstance(obj, Mapping):
+        return dict(obj)
+    return list(obj)
 
 
 def find_sub_sequences(list_a: List[Any], list_b: List[Any],
@@ -0,0 +1,29 @@
+# shared by the tests, run from this folder
+import os
+from typing import List, Optional
+
+from astexplorer.ast_comparer import AstComparer
+from astexplorer.ast_parser import AstParser
+from astexplorer.copypaste import Copypaste
+from astexplorer.func_tree import FuncTree
+
+EXAMPLES_FOLDER = '../examples'
+
+
+def copypaste_key(c: Copypaste):
+    # the same functions, nodes and run, unlike AstComparer.get_copypaste_key()
+    # two runs of one comparer over the same FuncTree objects give equal keys
+    return id(c.func_a), id(c.func_b), id(c.node_a), id(c.node_b), \
+           c.count, c.weight, c.start_index_a, c.end_index_a
+
+
+def read_functions(files: Optional[List[str]] = None) -> List[FuncTree]:
+    # the files' names are relative to the examples folder, all the
+    # examples if none are given. The functions are pre-processed (hashed)
+    if files is None:
+        files = sorted(f for f in os.listdir(EXAMPLES_FOLDER) if f.endswith('.py'))
+    functions = []  # type: List[FuncTree]
+    for file in files:
+        functions += AstParser().parse_module(os.path.join(EXAMPLES_FOLDER, file))
+    AstComparer().compare_pre_process_functions(functions)
+    return functions
@@ -36,6 +36,27 @@ def fn2(ct):
         cps = cmp.find_copypastes(functions)
         self.assertEqual(2, len(cps))
 
+    def test_min_cp_weight(self):
+        functions = AstParser().parse_string('''
+def fn1(a):
+    x = a
+    y = x
+
+def fn2(b):
+    x = b
+    y = x
+''', 'file.py')
+        cmp = AstComparer()
+        cmp.compare_pre_process_functions(functions)
+        cps = cmp.find_copypastes(functions)
+        self.assertEqual(1, len(cps))
+
+        cmp = AstComparer()
+        cmp.min_cp_weight = cps[0].weight + 1
+        self.assertEqual([], cmp.find_copypastes(functions))
+        self.assertEqual(0, cmp.list_comparisons)
+        self.assertEqual(1, cmp.pruned_comparisons)
+
     def test_find_dups_in_parser(self):
         fname = '../examples/lazy_copypaste.py'
         with open(fname, 'r') as myfile:
@@ -1,6 +1,7 @@
 from unittest import TestCase
 from astexplorer.ast_parser import *
 from astexplorer.ast_comparer import *
+from astexplorer.brief_node import VAR_NAMES_INDEX
 
 
 def read_file_line_by_line(file_path):
@@ -65,9 +66,26 @@ def compute_none(p):
         self.assertEqual(hashes_b['z'], hashes_a['x'], 'x / y')
         self.assertEqual(hashes_b['d'], hashes_a['y'], 'x / y')
 
+    def test_index_hashes_keep_variable_positions(self):
+        functions = AstParser().parse_string('''
+def fn1(a, b):
+    x = a * a + b
+
+def fn2(c, d):
+    y = c * c + d
+
+def fn3(a, b):
+    x = a * b + b
+''', 'file.py')
+        cmp = AstComparer()
+        cmp.compare_pre_process_functions(functions)
+        hashes = [f.children[0].hash_by_type[VAR_NAMES_INDEX] for f in functions]
+        self.assertEqual(hashes[0], hashes[1])
+        self.assertNotEqual(hashes[0], hashes[2])
+
     def extract_hashes(self,
                        node: BriefNode,
-                       hashes: List[str],
+                       hashes: List[int],
                        hash_key: str,
                        nodes: List[BriefNode]):
         hashes.append(node.hash_by_type[hash_key])
@@ -0,0 +1,55 @@
+from unittest import TestCase
+from astexplorer.ast_parser import *
+
+
+def get_file_lines_by_char(data: str) -> List[Tuple[int, int]]:
+    lines = []
+    start, i = 0, -1
+    for c in data:
+        i += 1
+        if c == '\n':
+            lines.append((start, i,))
+            start = i + 1
+        elif c == '\r':
+            start += 1
+    if start < len(data):
+        lines.append((start, len(data),))
+    return lines
+
+
+class ConstantAstParser(AstParser):
+    def process_constant(self, node, child):
+        child.id = repr(node.value)
+
+
+ConstantAstParser.register_expression_handler('Constant', 'process_constant')
+
+
+class TestAstParser(TestCase):
+    source = '''
+def fn1(a):
+    x = 5
+    x += a
+'''
+
+    def test_register_expression_handler(self):
+        functions = ConstantAstParser().parse_string(self.source, 'file.py')
+        self.assertEqual('5', functions[0].children[0].body['_'][0].id)
+        # the base class' handlers stay intact
+        functions = AstParser().parse_string(self.source, 'file.py')
+        self.assertEqual('Constant', functions[0].children[0].body['_'][0].id)
+
+    def test_aug_assign(self):
+        functions = AstParser().parse_string(self.source, 'file.py')
+        aug_assign = functions[0].children[1]
+        self.assertEqual('AugAssign', aug_assign.function)
+        self.assertEqual('Add', aug_assign.id)
+        self.assertEqual({'x'}, aug_assign.mutating_variables)
+
+    def test_file_lines(self):
+        for data in ['', '\n', 'a', 'ab\ncd', 'ab\ncd\n', 'ab\r\ncd\r\n', 'ab\rcd\ref\n',
+                     '\r\r\n\n', 'a\r', '\r', 'x = 1\r\n\r\ny = 2']:
+            self.assertEqual(get_file_lines_by_char(data), FileLines(data).lines, repr(data))
+        lines = FileLines('ab\r\ncd')
+        self.assertEqual((2, 3), lines.get_line_start_end(1, 1))
+        self.assertEqual((5, 6), lines.get_line_start_end(2, 1))
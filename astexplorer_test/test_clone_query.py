@@ -0,0 +1,75 @@
+import io
+import os
+import tempfile
+from contextlib import redirect_stdout, redirect_stderr
+from unittest import TestCase
+from astexplorer.clone_query import *
+
+
+class TestCloneQuery(TestCase):
+    snippet = '''
+        y = math.sin(angle / 180 * 3.14)
+        if y < 0:
+            y = -y
+    '''
+
+    def test_find_snippet(self):
+        with tempfile.TemporaryDirectory() as folder:
+            index_path = os.path.join(folder, 'index.bin')
+            build_index(index_path, ['../examples'])
+            with HashIndexFile(index_path) as index:
+                query = CloneQuery(index)
+                matches = query.find_snippet(self.snippet)
+                self.assertEqual([('func_a', 2), ('func_b', 2)],
+                                 [(m.function, m.count) for m in matches
+                                  if m.file.endswith('identical_functions.py')])
+                self.assertEqual([], query.find_snippet('x = 1\ny = 2\nz = 3\nprint(x, y, z)'))
+
+                lines = query.find_lines('../examples/identical_functions.py', 5, 7)
+                self.assertEqual([(m.file, m.start_index, m.end_index) for m in matches],
+                                 [(m.file, m.start_index, m.end_index) for m in lines])
+
+    def test_cli(self):
+        with tempfile.TemporaryDirectory() as folder:
+            index_path = os.path.join(folder, 'index.bin')
+            with redirect_stdout(io.StringIO()):
+                self.assertEqual(0, main(['build', index_path, '../examples']))
+            out = io.StringIO()
+            with redirect_stdout(out):
+                code = main(['query', index_path, '--file',
+                             '../examples/identical_functions.py', '--lines', '5-7'])
+            self.assertEqual(0, code)
+            self.assertIn('identical_functions.py:5-7: func_a', out.getvalue())
+            self.assertIn('identical_functions.py:12-14: func_b', out.getvalue())
+
+    def test_empty_body(self):
+        with tempfile.TemporaryDirectory() as folder:
+            index_path = os.path.join(folder, 'index.bin')
+            build_index(index_path, ['../examples'])
+            with HashIndexFile(index_path) as index:
+                query = CloneQuery(index)
+                self.assertEqual([], query.find_statements([]))
+                func = FuncTree('empty')
+                self.assertEqual([], query.find_function_body(func))
+
+    def test_cli_errors(self):
+        with tempfile.TemporaryDirectory() as folder:
+            index_path = os.path.join(folder, 'index.bin')
+            with redirect_stdout(io.StringIO()):
+                main(['build', index_path, '../examples'])
+            # lines 5-6 cut the "if" statement off its body
+            for lines in ['5-6', 'five']:
+                err = io.StringIO()
+                with redirect_stderr(err), self.assertRaises(SystemExit) as cm:
+                    main(['query', index_path, '--file',
+                          '../examples/identical_functions.py', '--lines', lines])
+                self.assertEqual(2, cm.exception.code)
+                self.assertIn('usage:', err.getvalue())
+
+            with open(index_path, 'wb') as fw:
+                fw.write(b'not an index')
+            err = io.StringIO()
+            with redirect_stderr(err), self.assertRaises(SystemExit):
+                main(['query', index_path, '--file',
+                      '../examples/identical_functions.py', '--lines', '5-7'])
+            self.assertIn('usage:', err.getvalue())
@@ -0,0 +1,63 @@
+from unittest import TestCase
+from astexplorer.ast_parser import *
+from astexplorer.ast_comparer import *
+from astexplorer.hash_index import StatementHashIndex
+from astexplorer_test.helpers import copypaste_key, read_functions
+
+
+class TestStatementHashIndex(TestCase):
+    def test_same_copypastes_as_all_pairs(self):
+        functions = read_functions()
+        cps_all = AstComparer().find_copypastes_all_pairs(functions)
+        cps_indexed = AstComparer().find_copypastes(functions)
+        self.assertGreater(len(cps_all), 0)
+        self.assertEqual([copypaste_key(c) for c in cps_all],
+                         [copypaste_key(c) for c in cps_indexed])
+
+    def test_nested_duplicate_blocks(self):
+        # the same run at the top level and in a nested block of each function:
+        # of the duplicates (by get_copypaste_key) the last one compared is
+        # reported, node_b depends on the order the statement lists are visited
+        source = '''
+def fa(p, q):
+    x = p + q
+    y = x * 2
+    if p:
+        x = p + q
+        y = x * 2
+
+def fb(p, q):
+    if q:
+        x = p + q
+        y = x * 2
+    x = p + q
+    y = x * 2
+'''
+        functions = AstParser().parse_string(source, 'file.py')
+        AstComparer().compare_pre_process_functions(functions)
+        fb_nested = functions[1].children[0].body[''][0]
+        # the former traversal's result, each run's node_b is fb's nested copy
+        expected = [(functions[0].children[0], fb_nested),
+                    (functions[0].children[2].body[''][0], fb_nested)]
+        for cps in [AstComparer().find_copypastes(functions),
+                    AstComparer().find_copypastes_all_pairs(functions)]:
+            self.assertEqual([(id(a), id(b)) for a, b in expected],
+                             [(id(c.node_a), id(c.node_b)) for c in cps])
+
+    def test_candidate_pairs(self):
+        functions = AstParser().parse_string('''
+def fn1(a):
+    x = a * 2
+    print(x)
+
+def fn2(b):
+    y = b * 2
+    print(y)
+
+def fn3(c):
+    return c
+''', 'file.py')
+        AstComparer().compare_pre_process_functions(functions)
+        index = StatementHashIndex()
+        index.build(functions)
+        self.assertEqual([(0, 1)], list(index.find_candidate_pairs()))
@@ -0,0 +1,63 @@
+import os
+import struct
+import sys
+import tempfile
+from unittest import TestCase
+from astexplorer.ast_comparer import *
+from astexplorer.ast_parser import *
+from astexplorer.brief_node import HASH_SCHEME
+from astexplorer.hash_index import StatementHashIndex
+from astexplorer.hash_index_file import *
+from astexplorer_test.helpers import read_functions
+
+
+class TestHashIndexFile(TestCase):
+    files = ['identical_functions.py', 'while_loop.py']
+
+    def test_write_read(self):
+        functions = read_functions(self.files)
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'index.bin')
+            write_index_file(path, functions)
+            with HashIndexFile(path) as index:
+                self.assertEqual(len(functions), index.function_count)
+                for i, func in enumerate(functions):
+                    file, name, start, end = index.get_function(i)
+                    self.assertEqual((func.file, func.name), (file, name))
+                    self.assertEqual(func.children[0].line_start, start)
+                    self.assertEqual(func.children[-1].line_end, end)
+                    statements = list(StatementHashIndex.iterate_statements(func.children))
+                    self.assertEqual([n.index_hash for n in statements],
+                                     index.get_statement_hashes(i).tolist())
+                    self.assertEqual([n.weight for n in statements],
+                                     index.get_statement_weights(i).tolist())
+
+                # identical functions share all the statement hashes
+                for h in index.get_statement_hashes(0).tolist():
+                    found = index.find_statements(h).tolist()
+                    self.assertEqual(h, index.statement_hashes[found[0]])
+                    self.assertIn(1, {index.statement_functions[s] for s in found})
+                self.assertEqual([], index.find_statements(0).tolist())
+
+    def test_wrong_file(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'index.bin')
+            with open(path, 'wb') as fw:
+                fw.write(b'\0' * 256)
+            with self.assertRaises(ValueError):
+                HashIndexFile(path)
+
+    def test_other_hashes(self):
+        functions = read_functions(self.files)
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'index.bin')
+            for hash_scheme, python_version in [(b'md5hex/1', sys.version_info[:2]),
+                                                (HASH_SCHEME.encode('ascii'), (2, 7))]:
+                write_index_file(path, functions)
+                with open(path, 'r+b') as fw:
+                    header = list(struct.unpack_from(HEADER_FORMAT, fw.read()))
+                    header[2], header[3], header[4] = hash_scheme, *python_version
+                    fw.seek(0)
+                    fw.write(struct.pack(HEADER_FORMAT, *header))
+                with self.assertRaisesRegex(ValueError, 'build the index again'):
+                    HashIndexFile(path)
@@ -0,0 +1,42 @@
+from unittest import TestCase
+from astexplorer.ast_parser import *
+from astexplorer.ast_comparer import *
+from astexplorer_test.helpers import copypaste_key, read_functions
+
+
+class TestIterateCopypastes(TestCase):
+    files = ['identical_functions.py', 'diff_arg_count.py', 'while_loop.py', 'lazy_copypaste.py']
+
+    def test_iterate(self):
+        functions = read_functions(self.files)
+        expected = AstComparer().find_copypastes(functions)
+        found = list(AstComparer().iterate_copypastes(functions))
+        self.assertGreater(len(expected), 0)
+        self.assertEqual({AstComparer.get_copypaste_key(c) for c in expected},
+                         {AstComparer.get_copypaste_key(c) for c in found})
+        self.assertEqual(len(expected), len(found))
+
+    def test_top_copypastes(self):
+        functions = read_functions(self.files)
+        expected = AstComparer().find_copypastes(functions)
+        top = AstComparer().find_top_copypastes(functions, 2)
+        self.assertEqual([AstComparer.get_copypaste_rank(c) for c in expected[:2]],
+                         [AstComparer.get_copypaste_rank(c) for c in top])
+        all_top = AstComparer().find_top_copypastes(functions, len(expected) + 1)
+        self.assertEqual(len(expected), len(all_top))
+
+    def test_update_after_iterate(self):
+        functions = read_functions(self.files)
+        expected = AstComparer().find_copypastes(functions[:-1])
+        self.assertGreater(len(expected), 0)
+
+        cmp = AstComparer()
+        list(cmp.iterate_copypastes(functions))
+        self.assertEqual([copypaste_key(c) for c in expected],
+                         [copypaste_key(c) for c in cmp.update_copypastes(functions[:-1])])
+
+        cmp = AstComparer()
+        cmp.find_copypastes(functions)
+        cmp.find_top_copypastes(functions, 2)
+        self.assertEqual([copypaste_key(c) for c in expected],
+                         [copypaste_key(c) for c in cmp.update_copypastes(functions[:-1])])
@@ -0,0 +1,59 @@
+from unittest import TestCase
+from astexplorer.ast_comparer import *
+from astexplorer.ast_parser import *
+from astexplorer.near_duplicate_finder import *
+
+SOURCE = '''
+import math
+
+
+def func_a(x: int, pref: str):
+    y = math.sin(x / 180 * 3.14)
+    if y < 0:
+        y = -y
+    z = math.cos(x / 180 * 3.14)
+    print('{0}: sin{1} = {2}'.format(pref, x, y))
+    return y * z
+
+
+def func_b(x: int, pref: str):
+    y = math.sin(x / 180 * 3.14)
+    if y < 0:
+        y = -y
+    z = math.cos(x / 180 * 3.14)
+    print('{0}: sin{1} = {2}'.format(pref, x, y))
+    return y + z
+
+
+def func_c(items):
+    total = 0
+    for item in items:
+        if item.enabled:
+            total += item.count
+    return total
+'''
+
+
+class TestNearDuplicateFinder(TestCase):
+    def test_edited_line(self):
+        functions = self.parse(SOURCE)
+        finder = NearDuplicateFinder(num_perm=64, bands=16, threshold=0.7)
+        dups = finder.find_near_duplicates(functions)
+        self.assertEqual(1, len(dups))
+        self.assertEqual(('func_a', 'func_b'), (dups[0].func_a.name, dups[0].func_b.name))
+        self.assertGreater(dups[0].similarity, 0.7)
+        self.assertLess(dups[0].similarity, 1)
+
+    def test_threshold(self):
+        functions = self.parse(SOURCE)
+        finder = NearDuplicateFinder(num_perm=64, bands=16, threshold=1)
+        self.assertEqual([], finder.find_near_duplicates(functions))
+
+    def test_bands(self):
+        with self.assertRaises(ValueError):
+            NearDuplicateFinder(num_perm=64, bands=10)
+
+    def parse(self, source: str) -> List[FuncTree]:
+        functions = AstParser().parse_string(source, 'near_duplicates.py')
+        AstComparer().compare_pre_process_functions(functions)
+        return functions
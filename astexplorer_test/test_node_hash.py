@@ -0,0 +1,76 @@
+import os
+import subprocess
+import sys
+from unittest import TestCase
+from astexplorer.ast_comparer import *
+from astexplorer.ast_parser import *
+from astexplorer.brief_node import BriefNode, combine_hashes, get_hash, \
+    VAR_NAMES_ORIGINAL, VAR_NAMES_INDEX, VAR_NAMES_HASH
+
+
+class TestNodeHash(TestCase):
+    def test_get_hash(self):
+        h = get_hash('Assign =')
+        self.assertIsInstance(h, int)
+        self.assertTrue(0 <= h < 1 << 64)
+        self.assertEqual(h, get_hash('Assign =' + ''))
+        hashes = {get_hash(f'Name v{i}') for i in range(100000)}
+        self.assertEqual(100000, len(hashes))
+
+    def test_combine_hashes(self):
+        a, b = get_hash('a'), get_hash('b')
+        self.assertNotEqual(combine_hashes(a, b), combine_hashes(b, a))
+        self.assertNotEqual(combine_hashes(a, b), combine_hashes(a, b, 0))
+        hashes = {combine_hashes(i, j) for i in range(400) for j in range(400)}
+        self.assertEqual(400 * 400, len(hashes))
+        self.assertTrue(all(0 <= h < 1 << 64 for h in hashes))
+
+    def test_known_digests(self):
+        # digests are stored in the parse cache and the index files,
+        # they should not depend on the Python version or platform
+        self.assertEqual(3405396810240292928, get_hash('a'))
+        self.assertEqual(11868681386100499350, combine_hashes(1, 2))
+        self.assertEqual(18224952338101807981, combine_hashes(get_hash('a'), 1, 2))
+        functions = AstParser().parse_string('''
+def fn(a):
+    x = a * 2
+    print(x)
+''', 'file.py')
+        AstComparer().compare_pre_process_functions(functions)
+        self.assertEqual([(6226556497673524060, 3528683686531948348),
+                          (8115235904698928601, 11926646156136420103)],
+                         [(c.index_hash, c.usage_hash) for c in functions[0].children])
+
+    def test_hash_seed_independent(self):
+        code = 'from astexplorer.brief_node import *; ' \
+               'print(combine_hashes(get_hash("a"), 1, 2))'
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        outputs = set()
+        for seed in ['1', '2']:
+            env = dict(os.environ, PYTHONHASHSEED=seed, PYTHONPATH=root)
+            outputs.add(subprocess.check_output([sys.executable, '-c', code], env=env))
+        self.assertEqual(1, len(outputs))
+
+    def test_hash_by_type(self):
+        node = BriefNode('Name')
+        node.hash_by_type = {VAR_NAMES_ORIGINAL: 1, VAR_NAMES_INDEX: 2, VAR_NAMES_HASH: 3}
+        self.assertEqual((1, 2, 3), (node.orig_hash, node.index_hash, node.usage_hash))
+        with self.assertRaises(TypeError):
+            node.hash_by_type[VAR_NAMES_INDEX] = 4
+        self.assertEqual(2, node.get_hash_by_type(VAR_NAMES_INDEX))
+
+    def test_operand_order(self):
+        functions = AstParser().parse_string('''
+def fn1(a):
+    x = a - 1
+
+def fn2(a):
+    x = 1 - a
+
+def fn3(b):
+    y = b - 1
+''', 'file.py')
+        AstComparer().compare_pre_process_functions(functions)
+        hashes = [f.children[0].index_hash for f in functions]
+        self.assertNotEqual(hashes[0], hashes[1])
+        self.assertEqual(hashes[0], hashes[2])
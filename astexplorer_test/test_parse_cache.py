@@ -0,0 +1,95 @@
+import copyreg
+import os
+import pickle
+import tempfile
+import types
+from unittest import TestCase
+from astexplorer.ast_parser import *
+from astexplorer.ast_comparer import *
+from astexplorer.brief_node import EMPTY_BODY, EMPTY_VARIABLES, VAR_NAMES_INDEX
+from astexplorer.parse_cache import ParseCache
+
+
+class TestParseCache(TestCase):
+    source = b'''
+def fn1(a):
+    x = a * 2
+    print(x)
+'''
+
+    def test_store_and_load(self):
+        with tempfile.TemporaryDirectory() as folder:
+            cache = ParseCache(folder)
+            key = cache.get_key(self.source)
+            self.assertIsNone(cache.load(key, 'a.py'))
+
+            functions = self.parse_functions()
+            cache.store(key, functions)
+            loaded = ParseCache(folder).load(key, 'b.py')
+            self.assertEqual(1, len(loaded))
+            self.assertEqual('b.py', loaded[0].file)
+            self.assertEqual([c.hash_by_type[VAR_NAMES_INDEX] for c in functions[0].children],
+                             [c.hash_by_type[VAR_NAMES_INDEX] for c in loaded[0].children])
+            self.assertNotEqual(key, cache.get_key(self.source + b'\n'))
+
+    def test_store_compacted(self):
+        with tempfile.TemporaryDirectory() as folder:
+            cache = ParseCache(folder)
+            key = cache.get_key(self.source)
+            functions = self.parse_functions()
+            functions[0].compact()
+            leaf = functions[0].children[0].arguments[0]
+            self.assertIs(EMPTY_BODY, leaf.body)
+            self.assertIs(EMPTY_VARIABLES, leaf.variables)
+
+            cache.store(key, functions)
+            loaded = cache.load(key, 'a.py')
+            self.assertEqual([c.index_hash for c in functions[0].children],
+                             [c.index_hash for c in loaded[0].children])
+            self.assertEqual(str(functions[0].children[0]), str(loaded[0].children[0]))
+            loaded_leaf = loaded[0].children[0].arguments[0]
+            self.assertIs(EMPTY_BODY, loaded_leaf.body)
+            self.assertIs(EMPTY_VARIABLES, loaded_leaf.variables)
+
+    def test_compacted_read_only(self):
+        functions = self.parse_functions()
+        functions[0].compact()
+        leaf = functions[0].children[0].arguments[0]
+        with self.assertRaises(TypeError):
+            leaf.body[''] = []
+        with self.assertRaises(TypeError):
+            leaf.variables.add_variable('x')
+        with self.assertRaises(TypeError):
+            leaf.variables.update(functions[0].children[0].variables)
+        self.assertEqual({}, dict(EMPTY_BODY))
+        self.assertIs(EMPTY_BODY, pickle.loads(pickle.dumps(EMPTY_BODY)))
+        self.assertNotIn(types.MappingProxyType, copyreg.dispatch_table)
+        self.assertEqual(0, len(EMPTY_VARIABLES.variables))
+
+    def test_corrupted_entry(self):
+        with tempfile.TemporaryDirectory() as folder:
+            cache = ParseCache(folder)
+            key = cache.get_key(self.source)
+            cache.store(key, self.parse_functions())
+            with open(cache.get_entry_path(key), 'wb') as fw:
+                fw.write(b'not a pickle')
+            self.assertIsNone(cache.load(key, 'a.py'))
+            self.assertFalse(os.path.isfile(cache.get_entry_path(key)))
+
+    def test_trim(self):
+        with tempfile.TemporaryDirectory() as folder:
+            cache = ParseCache(folder)
+            keys = [cache.get_key(self.source + b'#' * i) for i in range(4)]
+            for i, key in enumerate(keys):
+                cache.store(key, self.parse_functions())
+                os.utime(cache.get_entry_path(key), (i, i))
+            entry_size = os.path.getsize(cache.get_entry_path(keys[0]))
+            cache.max_size = entry_size * 2
+            cache.trim()
+            self.assertEqual([False, False, True, True],
+                             [os.path.isfile(cache.get_entry_path(k)) for k in keys])
+
+    def parse_functions(self) -> List[FuncTree]:
+        functions = AstParser().parse_string(self.source.decode('utf-8'), 'a.py')
+        AstComparer().compare_pre_process_functions(functions)
+        return functions
@@ -0,0 +1,62 @@
+import random
+from unittest import TestCase
+from astexplorer.ast_parser import *
+from astexplorer.suffix_array_comparer import *
+
+
+class TestSuffixArrayComparer(TestCase):
+    def test_suffix_array(self):
+        rnd = random.Random(1)
+        for n in [0, 1, 2, 10, 200]:
+            seq = [rnd.randint(0, 3) for _ in range(n)]
+            sa = build_suffix_array(seq)
+            self.assertEqual(sorted(range(n), key=lambda i: seq[i:]), sa)
+            lcp = build_lcp_array(seq, sa)
+            for i in range(1, n):
+                a, b = seq[sa[i - 1]:], seq[sa[i]:]
+                common = 0
+                while common < min(len(a), len(b)) and a[common] == b[common]:
+                    common += 1
+                self.assertEqual(common, lcp[i])
+
+    def test_identical(self):
+        cps = self.find_copypastes_in_file('../examples/identical_functions.py')
+        self.assertEqual(1, len(cps))
+        self.assertEqual(3, cps[0].count)
+
+    def test_diff_arg_count(self):
+        cps = self.find_copypastes_in_file('../examples/diff_arg_count.py')
+        self.assertEqual(1, len(cps))
+        self.assertEqual(3, cps[0].count)
+
+    def test_while_loop(self):
+        cps = self.find_copypastes_in_file('../examples/while_loop.py')
+        self.assertEqual([2, 2], [c.count for c in cps])
+        self.assertEqual({'fn1'}, {c.func_a.name for c in cps})
+
+    def test_frequent_run(self):
+        source = '''
+def fn(a):
+    x = a * 2
+    print(x)
+    return x
+'''
+        functions = [f for i in range(40) for f in AstParser().parse_string(source, f'file{i}.py')]
+        cmp = SuffixArrayComparer()
+        cmp.compare_pre_process_functions(functions)
+        cmp.max_pairwise_group = 40
+        self.assertEqual(40 * 39 // 2, len(cmp.find_copypastes(functions)))
+
+        # a copypaste for each function and the group's first one
+        cmp = SuffixArrayComparer()
+        cmp.max_pairwise_group = 10
+        cps = cmp.find_copypastes(functions)
+        self.assertEqual(39, len(cps))
+        self.assertEqual(40, len({id(c.func_a) for c in cps} | {id(c.func_b) for c in cps}))
+        self.assertEqual({3}, {c.count for c in cps})
+
+    def find_copypastes_in_file(self, fname: str) -> List[Copypaste]:
+        functions = AstParser().parse_module(fname)
+        cmp = SuffixArrayComparer()
+        cmp.compare_pre_process_functions(functions)
+        return cmp.find_copypastes(functions)
@@ -0,0 +1,128 @@
+from unittest import TestCase
+from astexplorer.ast_parser import *
+from astexplorer.ast_comparer import *
+from astexplorer_test.helpers import copypaste_key
+
+
+class TestUpdateCopypastes(TestCase):
+    file_a = '''
+def fn1(a):
+    x = a * 2
+    print(x)
+    return x
+
+def fn2(b):
+    y = b * 2
+    print(y)
+    return b
+'''
+
+    file_b = '''
+def fn3(c):
+    z = c * 2
+    print(z)
+    return z
+'''
+
+    file_b_changed = '''
+def fn3(c):
+    z = c * 3
+    print(z)
+    return z
+
+def fn4(d):
+    y = d * 2
+    print(y)
+    return d
+'''
+
+    file_c = '''
+def fn5(e):
+    v = e * 2
+    print(v)
+    return v
+'''
+
+    # fn7 vs fn6 gives a copypaste, fn6 vs fn7 gives none
+    file_d = '''
+def fn6(f):
+    print(x)
+    y = x + 1
+
+def fn7(g):
+    print(x)
+    print(x)
+    y = x + 1
+'''
+
+    file_d_renamed = '''
+def fn7(g):
+    print(x)
+    print(x)
+    y = x + 1
+
+def fn8(f):
+    print(x)
+    y = x + 1
+'''
+
+    def test_changed_file(self):
+        funcs_a = self.parse(self.file_a, 'a.py')
+        funcs_b = self.parse(self.file_b, 'b.py')
+        funcs_c = self.parse(self.file_c, 'c.py')
+        cmp = AstComparer()
+        cmp.find_copypastes(funcs_a + funcs_b + funcs_c)
+
+        funcs_b = self.parse(self.file_b_changed, 'b.py')
+        functions = funcs_a + funcs_b + funcs_c
+        updated = cmp.update_copypastes(functions)
+        expected = AstComparer().find_copypastes(functions)
+        self.assertGreater(len(expected), 0)
+        self.assertEqual([copypaste_key(c) for c in expected],
+                         [copypaste_key(c) for c in updated])
+
+    def test_removed_and_reordered_files(self):
+        funcs_a = self.parse(self.file_a, 'a.py')
+        funcs_b = self.parse(self.file_b, 'b.py')
+        funcs_c = self.parse(self.file_c, 'c.py')
+        cmp = AstComparer()
+        cmp.find_copypastes(funcs_a + funcs_b + funcs_c)
+
+        functions = funcs_c + funcs_a
+        updated = cmp.update_copypastes(functions)
+        expected = AstComparer().find_copypastes(functions)
+        self.assertGreater(len(expected), 0)
+        self.assertEqual([copypaste_key(c) for c in expected],
+                         [copypaste_key(c) for c in updated])
+        self.assertNotIn(id(funcs_b[0]), [id(f) for f in cmp.index.functions.values()])
+
+    def test_reordered_functions(self):
+        funcs_d = self.parse(self.file_d, 'd.py')
+        cmp = AstComparer()
+        self.assertEqual(0, len(cmp.find_copypastes(funcs_d)))
+
+        functions = list(reversed(funcs_d))
+        updated = cmp.update_copypastes(functions)
+        expected = AstComparer().find_copypastes(functions)
+        self.assertGreater(len(expected), 0)
+        self.assertEqual([copypaste_key(c) for c in expected],
+                         [copypaste_key(c) for c in updated])
+
+    def test_renamed_function(self):
+        funcs_a = self.parse(self.file_a, 'a.py')
+        funcs_d = self.parse(self.file_d, 'd.py')
+        cmp = AstComparer()
+        cmp.find_copypastes(funcs_a + funcs_d)
+
+        funcs_d = self.parse(self.file_d_renamed, 'd.py')
+        functions = funcs_a + funcs_d
+        updated = cmp.update_copypastes(functions)
+        expected = AstComparer().find_copypastes(functions)
+        self.assertGreater(len(expected), 0)
+        self.assertEqual([copypaste_key(c) for c in expected],
+                         [copypaste_key(c) for c in updated])
+
+    def parse(self, source: str, file_path: str) -> List[FuncTree]:
+        functions = AstParser().parse_string(source, file_path)
+        AstComparer().compare_pre_process_functions(functions)
+        return functions
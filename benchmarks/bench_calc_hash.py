@@ -0,0 +1,70 @@
+# FuncTree.calc_hashes on deeply nested expressions: Merkle hashing
+# vs the former "stringify each subtree" hashing.
+# Run from the repository root: python -m benchmarks.bench_calc_hash
+import hashlib
+import sys
+import timeit
+
+from astexplorer.ast_parser import AstParser
+from astexplorer.brief_node import BriefNode, VAR_NAMES_INDEX
+from astexplorer.func_tree import FuncTree
+
+
+def get_md5_hash(s: str) -> str:
+    return hashlib.md5(s.encode('utf-8')).hexdigest()
+
+
+class StringifyFuncTree(FuncTree):
+    # the former implementation: each node's hash source is the node's
+    # stringified subtree plus its children's hex MD5 hashes
+    def calc_hash(self,
+                  child: BriefNode,
+                  var_names: str) -> str:
+        hash_src = child.stringify(child, var_names)
+        for key in child.body:
+            for sub in child.body[key]:
+                hash_src += self.calc_hash(sub, var_names)
+        for arg in child.arguments:
+            hash_src += self.calc_hash(arg, var_names)
+        child.set_hash_by_type(var_names, get_md5_hash(hash_src))
+        return child.get_hash_by_type(var_names)
+
+
+def build_source(depth: int) -> str:
+    # v = (a0 + a1 * 2) + (a2 + a3 * 2) ... - left-nested BinOp chain
+    terms = [f'(a{i % 7} + a{(i + 1) % 7} * 2)' for i in range(depth)]
+    return 'def nested(a0, a1, a2, a3, a4, a5, a6):\n' + \
+           f'    v = {" + ".join(terms)}\n' + \
+           '    return v\n'
+
+
+def parse_function(src: str, tree_class) -> FuncTree:
+    func = AstParser().parse_string(src, 'nested.py')[0]
+    func.__class__ = tree_class
+    func.rename_ptrs()
+    func.weight_tree()
+    return func
+
+
+def measure(depth: int, tree_class, number: int) -> float:
+    # subtree hashes only: the variables' hashing is the same for both
+    func = parse_function(build_source(depth), tree_class)
+
+    def calc_hashes():
+        for child in func.children:
+            func.calc_hash(child, VAR_NAMES_INDEX)
+    return timeit.timeit(calc_hashes, number=number) / number
+
+
+def main():
+    sys.setrecursionlimit(20000)
+    print(f'{"depth":>8}{"stringify, ms":>16}{"merkle, ms":>14}{"speedup":>10}')
+    for depth in (25, 50, 100, 200, 400):
+        number = max(1, 400 // depth)
+        old_time = measure(depth, StringifyFuncTree, number)
+        new_time = measure(depth, FuncTree, number)
+        print(f'{depth:>8}{old_time * 1000:>16.2f}{new_time * 1000:>14.2f}{old_time / new_time:>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+# pythonparser on the standard library sources it accepts: the combinator
+# interpreter vs the compiled mode (Rule proxies resolved once per parser,
+# Alt / Star / Plus choosing the rules to try by the current token's kind).
+# Run from the repository root: python -m benchmarks.bench_compiled_grammar [max_files]
+import os
+import sys
+import sysconfig
+import time
+from typing import List
+
+import pythonparser
+from pythonparser import diagnostic
+
+VERSION = (3, 5)
+
+
+def read_corpus(max_files: int) -> List[str]:
+    # the stdlib files parsed without errors
+    sources = []  # type: List[str]
+    engine = diagnostic.Engine()
+    engine.render_diagnostic = lambda diag: None
+    folder = sysconfig.get_paths()['stdlib']
+    for root, dirs, files in os.walk(folder):
+        dirs[:] = sorted(d for d in dirs if d not in ('site-packages', 'test', 'tests'))
+        for file in sorted(files):
+            if not file.endswith('.py') or len(sources) >= max_files:
+                continue
+            try:
+                with open(os.path.join(root, file), encoding='utf-8') as fr:
+                    code = fr.read()
+                pythonparser.parse(code, file, version=VERSION, engine=engine)
+            except (diagnostic.Error, UnicodeDecodeError, RecursionError):
+                continue
+            sources.append(code)
+    return sources
+
+
+def measure(sources: List[str], **kwargs) -> float:
+    start = time.perf_counter()
+    for code in sources:
+        pythonparser.parse(code, version=VERSION, **kwargs)
+    return time.perf_counter() - start
+
+
+def main():
+    max_files = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    sources = read_corpus(max_files)
+    print(f'{len(sources)} files, {sum(len(s) for s in sources) // 1024} KB')
+    # the compiled mode builds its dispatch tables on the first parse
+    start = time.perf_counter()
+    pythonparser.parse(sources[0], version=VERSION, compiled=True)
+    print(f'first compiled parse: {time.perf_counter() - start:.3f} s')
+    for name, kwargs in [('interpreter', {}), ('compiled', {'compiled': True}),
+                         ('compiled, packrat', {'compiled': True, 'packrat': True})]:
+        best = min(measure(sources, **kwargs) for _ in range(3))
+        print(f'{name}: {best:.2f} s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+# FileLines line index on multi-megabyte generated files:
+# str.find based index vs the former char by char loop.
+# Run from the repository root: python -m benchmarks.bench_file_lines
+import timeit
+from typing import List, Tuple
+
+from astexplorer.ast_parser import FileLines
+
+
+def get_file_lines_by_char(data: str) -> List[Tuple[int, int]]:
+    # the former implementation
+    lines = []
+    start, i = 0, -1
+    for c in data:
+        i += 1
+        if c not in {chr(0x0A), chr(0x0D)}:
+            continue
+        if c == chr(0x0A):
+            lines.append((start, i,))
+            start = i + 1
+            continue
+        if c == chr(0x0D):
+            start += 1
+    if start < len(data):
+        lines.append((start, len(data),))
+    return lines
+
+
+def build_source(size: int, new_line: str) -> str:
+    lines = []
+    total = 0
+    i = 0
+    while total < size:
+        line = f'    value_{i} = compute(value_{i - 1}, {i}) * 2  # comment {i}'
+        lines.append(line)
+        total += len(line) + len(new_line)
+        i += 1
+    return new_line.join(lines)
+
+
+def main():
+    print(f'{"size, MB":>10}{"newline":>9}{"by char, ms":>14}{"find, ms":>11}{"speedup":>9}')
+    for size_mb in (1, 4, 16):
+        for new_line in ('\n', '\r\n'):
+            data = build_source(size_mb * 1024 * 1024, new_line)
+            assert FileLines(data).lines == get_file_lines_by_char(data)
+            old_time = timeit.timeit(lambda: get_file_lines_by_char(data), number=1)
+            new_time = timeit.timeit(lambda: FileLines(data), number=1)
+            print(f'{size_mb:>10}{repr(new_line):>9}{old_time * 1000:>14.1f}{new_time * 1000:>11.1f}'
+                  f'{old_time / new_time:>9.1f}')
+
+
+if __name__ == '__main__':
+    main()
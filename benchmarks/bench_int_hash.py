@@ -0,0 +1,108 @@
+# FuncTree subtree hashing: 64 bit integer digests mixed as integers
+# vs the former hex MD5 digests joined as strings.
+# Run from the repository root: python -m benchmarks.bench_int_hash
+import hashlib
+import random
+import sys
+import timeit
+from typing import List
+
+from astexplorer.ast_parser import AstParser
+from astexplorer.brief_node import BriefNode, VAR_NAMES_INDEX, get_hash, hash_leaf_node
+from astexplorer.func_tree import FuncTree
+
+
+def get_md5_hash(s: str) -> str:
+    return hashlib.md5(s.encode('utf-8')).hexdigest()
+
+
+class Md5FuncTree(FuncTree):
+    # the former implementation
+    HASH_SEPARATOR = chr(0x1F)
+
+    def calc_hash(self,
+                  child: BriefNode,
+                  var_names: str) -> str:
+        hash_src = [child.get_label(var_names), str(child.depth)]
+        for key in child.body:
+            hash_src.append(key)
+            for sub in child.body[key]:
+                self.append_md5_hash(child, sub, var_names, hash_src)
+        hash_src.append(':')
+        for arg in child.arguments:
+            self.append_md5_hash(child, arg, var_names, hash_src)
+
+        node_hash = get_md5_hash(self.HASH_SEPARATOR.join(hash_src))
+        child.set_hash_by_type(var_names, node_hash)
+        return node_hash
+
+    def append_md5_hash(self,
+                        parent: BriefNode,
+                        child: BriefNode,
+                        var_names: str,
+                        hash_src: List[str]) -> None:
+        hash_src.append(self.calc_hash(child, var_names))
+        var_indices = parent.variables.index_by_name
+        hash_src.append(','.join([str(var_indices[v.name]) for v in child.variables.variables]))
+
+
+STATEMENTS = [
+    'x = a * {k} + b',
+    'y = math.sin(x / 180 * 3.14)',
+    'print("{{0}}: {{1}}".format(x, y))',
+    'b += {k}',
+    'items.append(x - y * {k})',
+]
+
+
+def build_source(functions: int, seed: int = 1) -> str:
+    rnd = random.Random(seed)
+    lines = []
+    for i in range(functions):
+        lines.append(f'def fn{i}(a, b, items):')
+        for _ in range(4):
+            lines.append('    ' + rnd.choice(STATEMENTS).format(k=rnd.randint(1, 9)))
+            lines.append(f'    if a > {rnd.randint(1, 9)}:')
+            for _ in range(3):
+                lines.append('        ' + rnd.choice(STATEMENTS).format(k=rnd.randint(1, 9)))
+        lines.append('    return items')
+        lines.append('')
+    return '\n'.join(lines)
+
+
+def iterate_nodes(nodes: List[BriefNode]):
+    for node in nodes:
+        yield node
+        for key in node.body:
+            yield from iterate_nodes(node.body[key])
+        yield from iterate_nodes(node.arguments)
+
+
+def measure(tree_class, number: int):
+    functions = AstParser().parse_string(build_source(200), 'generated.py')
+    for func in functions:
+        func.__class__ = tree_class
+        func.rename_ptrs()
+        func.weight_tree()
+
+    def calc_hashes():
+        # every pass starts with cold digest caches
+        get_hash.cache_clear()
+        hash_leaf_node.cache_clear()
+        for f in functions:
+            for child in f.children:
+                f.calc_hash(child, VAR_NAMES_INDEX)
+    elapsed = min(timeit.repeat(calc_hashes, number=number, repeat=5)) / number
+    hashes = [n.index_hash for f in functions for n in iterate_nodes(f.children)]
+    return elapsed, len(hashes), sum(sys.getsizeof(h) for h in hashes)
+
+
+def main():
+    print(f'{"digests":>10}{"time, ms":>10}{"nodes":>8}{"digests, KB":>13}')
+    for title, tree_class in (('md5 hex', Md5FuncTree), ('int', FuncTree)):
+        elapsed, nodes, size = measure(tree_class, 10)
+        print(f'{title:>10}{elapsed * 1000:>10.1f}{nodes:>8}{size / 1024:>13.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+# pythonparser Lexer throughput on the standard library sources, tokens/sec:
+# the former lexer (list queue dequeued with pop(0), Token with __dict__)
+# vs the deque queue and the slotted Token; and the memory taken by the
+# tokens when all of them are kept, as Parser does.
+# Run from the repository root: python -m benchmarks.bench_lexer [max_files]
+import os
+import sys
+import sysconfig
+import time
+import tracemalloc
+from typing import List, Tuple
+
+from pythonparser import diagnostic, lexer, source
+
+VERSION = (3, 6)
+# the current token class, lexer.Token is replaced while the former one is measured
+Token = lexer.Token
+
+
+class FormerToken:
+    def __init__(self, loc, kind, value=None):
+        self.loc, self.kind, self.value = loc, kind, value
+
+
+class FormerLexer(lexer.Lexer):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.queue = []
+
+    def next(self, eof_token=False):
+        if len(self.queue) == 0:
+            self._refill(eof_token)
+        return self.queue.pop(0)
+
+
+def read_corpus(max_files: int) -> List[source.Buffer]:
+    # the stdlib files the lexer reads without errors
+    buffers = []  # type: List[source.Buffer]
+    folder = sysconfig.get_paths()['stdlib']
+    for root, dirs, files in os.walk(folder):
+        dirs[:] = sorted(d for d in dirs if d not in ('site-packages', 'test', 'tests'))
+        for file in sorted(files):
+            if not file.endswith('.py') or len(buffers) >= max_files:
+                continue
+            try:
+                with open(os.path.join(root, file), encoding='utf-8') as fr:
+                    buffer = source.Buffer(fr.read(), file)
+                lex(lexer.Lexer, buffer)
+            except (diagnostic.Error, UnicodeDecodeError, SyntaxError, ValueError):
+                continue
+            buffers.append(buffer)
+    return buffers
+
+
+def lex(lexer_class, buffer: source.Buffer) -> int:
+    engine = diagnostic.Engine(all_errors_are_fatal=True)
+    engine.render_diagnostic = lambda diag: None
+    count = 0
+    for _ in lexer_class(buffer, VERSION, engine):
+        count += 1
+    return count
+
+
+def measure(lexer_class, token_class, buffers: List[source.Buffer]) -> Tuple[int, float]:
+    lexer.Token = token_class
+    try:
+        start = time.perf_counter()
+        count = sum(lex(lexer_class, b) for b in buffers)
+        return count, time.perf_counter() - start
+    finally:
+        lexer.Token = Token
+
+
+def measure_memory(lexer_class, token_class, buffers: List[source.Buffer]) -> int:
+    lexer.Token = token_class
+    engine = diagnostic.Engine(all_errors_are_fatal=True)
+    try:
+        tracemalloc.start()
+        tokens = []
+        for b in buffers:
+            tokens += lexer_class(b, VERSION, engine)
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        return size
+    finally:
+        lexer.Token = Token
+
+
+def main():
+    max_files = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    buffers = read_corpus(max_files)
+    print(f'{len(buffers)} files, {sum(len(b.source) for b in buffers) // 1024} KB')
+    for name, lexer_class, token_class in [('former', FormerLexer, FormerToken),
+                                           ('deque, slotted Token', lexer.Lexer, Token)]:
+        best = None
+        for _ in range(3):
+            count, elapsed = measure(lexer_class, token_class, buffers)
+            best = elapsed if best is None else min(best, elapsed)
+        memory = measure_memory(lexer_class, token_class, buffers)
+        print(f'{name}: {count} tokens, {best:.2f} s, {count / best:,.0f} tokens/sec, '
+              f'{memory / 1024 / 1024:.0f} MB kept')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+# Memory taken by parsed functions' trees, bytes per BriefNode: the former
+# layout (a __dict__ per node and variable, a hash_by_type dict per node,
+# fresh empty containers left by compact()) vs the slotted nodes and
+# the shared read-only empty containers.
+# Run from the repository root: python -m benchmarks.bench_node_memory [folder]
+import gc
+import os
+import sys
+import types
+from typing import List, Iterable
+
+from astexplorer.ast_comparer import AstComparer
+from astexplorer.ast_parser import AstParser
+from astexplorer.brief_node import BriefNode, BriefVariableSet, \
+    VAR_NAMES_ORIGINAL, VAR_NAMES_INDEX, VAR_NAMES_HASH
+from astexplorer.func_tree import FuncTree
+
+
+class FormerBriefVariable:
+    def __init__(self, name: str, block_index: str, usage_hash: int):
+        self.name = name
+        self.block_index = block_index
+        self.usage_hash = usage_hash
+
+
+class FormerBriefVariableSet:
+    def __init__(self, variables: BriefVariableSet = None):
+        self.variables = [FormerBriefVariable(v.name, v.block_index, v.usage_hash)
+                          for v in variables.variables] if variables else []
+        self.index_by_name = dict(variables.index_by_name) if variables else {}
+
+
+class FormerBriefNode:
+    # a copy of the node in the former layout
+    def __init__(self, node: BriefNode):
+        self.function = node.function
+        self.arguments = [FormerBriefNode(a) for a in node.arguments]
+        self.body = {k: [FormerBriefNode(n) for n in v] for k, v in node.body.items()}
+        self.id = node.id
+        self.instance = node.instance
+        self.weight = node.weight
+        self.depth = node.depth
+        self.hash_by_type = {VAR_NAMES_ORIGINAL: node.orig_hash,
+                             VAR_NAMES_INDEX: node.index_hash,
+                             VAR_NAMES_HASH: node.usage_hash}
+        self.line_start = node.line_start
+        self.line_end = node.line_end
+        self.variables = FormerBriefVariableSet(node.variables)
+        self.mutating_variables = set(node.mutating_variables)
+
+    def compact(self) -> None:
+        # the former FuncTree.compact_node()
+        self.variables = FormerBriefVariableSet()
+        self.mutating_variables = set()
+        for arg in self.arguments:
+            arg.compact()
+        for child_list in self.body.values():
+            for child in child_list:
+                child.compact()
+
+
+def read_functions(folder: str) -> List[FuncTree]:
+    functions = []
+    for path, _, file_names in os.walk(folder):
+        for file_name in sorted(file_names):
+            if not file_name.endswith('.py'):
+                continue
+            try:
+                functions += AstParser().parse_module(os.path.join(path, file_name))
+            except Exception:
+                pass
+    AstComparer().compare_pre_process_functions(functions)
+    return functions
+
+
+def count_nodes(functions: List[FuncTree]) -> int:
+    def count(nodes: Iterable) -> int:
+        total = 0
+        for node in nodes:
+            total += 1 + count(node.arguments)
+            for sub_list in node.body.values():
+                total += count(sub_list)
+        return total
+    return sum([count(f.children) for f in functions])
+
+
+def deep_size(roots: List) -> int:
+    # size of all the objects reachable from the nodes, each object is counted once
+    skipped = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType)
+    seen = set()
+    stack = list(roots)
+    total = 0
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, skipped):
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+        stack.extend(gc.get_referents(obj))
+    return total
+
+
+def main():
+    folder = sys.argv[1] if len(sys.argv) > 1 else os.path.dirname(os.__file__)
+    functions = read_functions(folder)
+    nodes = count_nodes(functions)
+    print(f'{len(functions)} functions, {nodes} nodes in {folder}')
+    former = [FormerBriefNode(n) for f in functions for n in f.children]
+    current = [n for f in functions for n in f.children]
+    print(f'hashed trees:    former {deep_size(former) / nodes:8.1f}, '
+          f'current {deep_size(current) / nodes:8.1f} bytes per node')
+    for node in former:
+        node.compact()
+    for f in functions:
+        f.compact()
+    print(f'compacted trees: former {deep_size(former) / nodes:8.1f}, '
+          f'current {deep_size(current) / nodes:8.1f} bytes per node')
+
+
+if __name__ == '__main__':
+    main()
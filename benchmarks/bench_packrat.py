@@ -0,0 +1,61 @@
+# pythonparser on expression-heavy generated modules (calls, comprehensions,
+# dict / set displays, subscripts, lambdas, conditional expressions): parse
+# time and peak memory without and with the packrat cache.
+# Run from the repository root: python -m benchmarks.bench_packrat [statements]
+import random
+import sys
+import time
+import tracemalloc
+from typing import Tuple
+
+import pythonparser
+
+VERSION = (3, 5)
+
+
+def build_expression(rnd: random.Random, depth: int) -> str:
+    if depth == 0:
+        return rnd.choice(['a', 'b', '1', 'x.y', 'f(a)', '"s"'])
+    sub = [build_expression(rnd, depth - 1) for _ in range(3)]
+    return rnd.choice([
+        f'({sub[0]} + {sub[1]} * 2)',
+        f'f({sub[0]}, k={sub[1]})',
+        f'[{sub[0]} for a in {sub[1]} if {sub[2]}]',
+        f'{sub[0]}[{sub[1]}]',
+        f'{sub[0]}[{sub[1]}:{sub[2]}]',
+        f'{{{sub[0]}: {sub[1]}}}',
+        f'{{{sub[0]}, {sub[1]}}}',
+        f'(lambda a: {sub[0]})',
+        f'({sub[0]} if {sub[1]} else {sub[2]})'])
+
+
+def build_source(statements: int) -> str:
+    rnd = random.Random(1)
+    return ''.join(f'v{i} = {build_expression(rnd, 4)}\n' for i in range(statements))
+
+
+def measure(code: str, packrat: bool) -> Tuple[float, int]:
+    best = None
+    for _ in range(3):
+        start = time.perf_counter()
+        pythonparser.parse(code, version=VERSION, packrat=packrat)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    tracemalloc.start()
+    pythonparser.parse(code, version=VERSION, packrat=packrat)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak
+
+
+def main():
+    statements = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    code = build_source(statements)
+    print(f'{statements} statements, {len(code) // 1024} KB')
+    for packrat in (False, True):
+        elapsed, peak = measure(code, packrat)
+        print(f'packrat={packrat}: {elapsed:.2f} s, peak memory {peak / 1024 / 1024:.1f} MB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+# AstComparer.find_copypastes on generated functions with nested blocks:
+# statement list comparisons made and skipped as too light, the former
+# comparer descending into every pair of nested bodies vs the pruning one.
+# Both should report the same copypastes, down to the B side nodes.
+# Run from the repository root: python -m benchmarks.bench_prune
+import random
+import time
+from typing import List, Tuple
+
+from astexplorer.ast_comparer import AstComparer
+from astexplorer.ast_parser import AstParser
+from astexplorer.brief_node import BriefNode
+from astexplorer.copypaste import Copypaste
+from astexplorer.func_tree import FuncTree
+from astexplorer.utils import find_sub_sequences
+
+
+class FormerAstComparer(AstComparer):
+    # the former implementation: no pruning
+    def find_node_copypastes(self, fa: FuncTree, fb: FuncTree,
+                             a_list: List[BriefNode], b_list: List[BriefNode]) -> None:
+        self.list_comparisons += 1
+        cp_list = find_sub_sequences(a_list, b_list,
+                                     lambda x, y:
+                                     x.index_hash == y.index_hash)
+        for cp in cp_list:
+            if cp.count < 2:
+                continue
+            cpy = Copypaste(fa, fb, a_list[cp.start_a], b_list[cp.start_b])
+            cpy.count = cp.count
+            for i in range(cp.start_a + 1, cp.start_a + cp.count):
+                cpy.update(a_list[i])
+            self.copypastes.append(cpy)
+
+        for a in a_list:
+            for b in b_list:
+                if b.depth >= a.depth:
+                    if "" in b.body:
+                        if len(b.body[""]) == 0:
+                            continue
+                        self.find_node_copypastes(fa, fb, a_list, b.body[""])
+            if "" in a.body:
+                if len(a.body[""]) == 0:
+                    continue
+                self.find_node_copypastes(fa, fb, a.body[""], b_list)
+
+
+# the pruning is on only when the comparer has a weight threshold,
+# the heavier the threshold the more statement lists are pruned
+MIN_CP_WEIGHTS = [20, 80, 120]
+
+STATEMENTS = [
+    'x = a * {k}',
+    'y = x + b',
+    'print(x, y)',
+    'b += 1',
+    'a = b - {k}',
+]
+
+
+def build_source(functions: int, seed: int = 1) -> str:
+    rnd = random.Random(seed)
+    lines = []
+    for i in range(functions):
+        lines.append(f'def fn{i}(a, b):')
+        for block in range(3):
+            for _ in range(2):
+                lines.append('    ' + rnd.choice(STATEMENTS).format(k=rnd.randint(1, 3)))
+            lines.append(f'    if a > {block}:')
+            for _ in range(2):
+                lines.append('        ' + rnd.choice(STATEMENTS).format(k=rnd.randint(1, 3)))
+            lines.append('        while b < a:')
+            for _ in range(2):
+                lines.append('            ' + rnd.choice(STATEMENTS).format(k=rnd.randint(1, 3)))
+        lines.append('    return a')
+        lines.append('')
+    return '\n'.join(lines)
+
+
+def get_identity(c: Copypaste) -> Tuple[int, ...]:
+    # unlike AstComparer.get_copypaste_key(), includes the B side
+    return id(c.func_a), id(c.func_b), id(c.node_a), id(c.node_b), \
+           c.count, c.weight, c.start_index_a, c.end_index_a
+
+
+def measure(comparer: AstComparer, functions: List[FuncTree]) -> List[Tuple[int, ...]]:
+    start = time.perf_counter()
+    copypastes = [c for c in comparer.find_copypastes(functions)
+                  if c.weight >= comparer.min_cp_weight]
+    elapsed = time.perf_counter() - start
+    print(f'{comparer.min_cp_weight:>8}{comparer.__class__.__name__:>20}{comparer.list_comparisons:>14}'
+          f'{comparer.pruned_comparisons:>10}{len(copypastes):>12}{elapsed:>10.2f}')
+    return [get_identity(c) for c in copypastes]
+
+
+def main():
+    functions = AstParser().parse_string(build_source(60), 'generated.py')
+    AstComparer().compare_pre_process_functions(functions)
+    print(f'{"weight":>8}{"comparer":>20}{"comparisons":>14}{"pruned":>10}{"copypastes":>12}{"time, s":>10}')
+    for min_cp_weight in MIN_CP_WEIGHTS:
+        results = []
+        for comparer in [FormerAstComparer(), AstComparer()]:
+            comparer.min_cp_weight = min_cp_weight
+            results.append(measure(comparer, functions))
+        print('same copypastes' if results[0] == results[1] else 'copypastes differ')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+# SourceTreeRender.read_folder_tree on a generated folder tree: the former
+# walker (os.listdir, isdir / isfile calls, name_matches_pattern() compiling a regex per
+# name and pattern) vs the scandir walker with the compiled PathMatcher.
+# Run from the repository root: python -m benchmarks.bench_walk [entries]
+import os
+import sys
+import tempfile
+import time
+from typing import Optional
+
+from vizualization.folder_map import FolderNode
+from vizualization.source_tree_render import SourceTreeRender
+
+FILES_PER_FOLDER = 50
+FOLDERS_PER_FOLDER = 8
+EXTENSIONS = ['.py', '.py', '.pyc', '.txt', '.json']
+
+
+class FormerSourceTreeRender(SourceTreeRender):
+    def read_folder_tree(self, path: str, parent: Optional[FolderNode],
+                         is_file: Optional[bool] = None, rel_path: str = '') -> None:
+        if not self.former_should_parse(path):
+            return
+        node = FolderNode(path)
+        if not parent:
+            self.root_folder = node
+        else:
+            node.ancestors = list(parent.ancestors)
+            node.ancestors.append(parent)
+            parent.children.append(node)
+        if os.path.isdir(path):
+            for file_name in os.listdir(path):
+                sub_path = os.path.join(path, file_name)
+                self.read_folder_tree(sub_path, node)
+        else:
+            self.total_files += 1
+
+    def former_should_parse(self, path: str) -> bool:
+        file_name = os.path.basename(path)
+        is_file = os.path.isfile(path)
+        if is_file and self.include_list and \
+                not any([self.name_matches_pattern(file_name, p) for p in self.include_list]):
+            return False
+        if self.ignore_list and \
+                any([self.name_matches_pattern(file_name, p) for p in self.ignore_list]):
+            return False
+        return True
+
+
+def make_tree(root: str, entries: int) -> int:
+    # breadth-first: folders with FILES_PER_FOLDER files and FOLDERS_PER_FOLDER subfolders
+    made = 0
+    folders = [root]
+    while made < entries:
+        folder = folders.pop(0)
+        for i in range(FILES_PER_FOLDER):
+            open(os.path.join(folder, f'module_{i}{EXTENSIONS[i % len(EXTENSIONS)]}'), 'w').close()
+        made += FILES_PER_FOLDER
+        for i in range(FOLDERS_PER_FOLDER):
+            sub_folder = os.path.join(folder, 'venv' if i == 0 else f'package_{i}')
+            os.mkdir(sub_folder)
+            folders.append(sub_folder)
+        made += FOLDERS_PER_FOLDER
+    return made
+
+
+def walk(render: SourceTreeRender, folder: str) -> float:
+    render.source_folders = [folder]
+    render.ignore_list = ['venv', '__pycache__', '*.egg-info', 'node_modules', '.git', 'build']
+    render.include_list = ['*.py']
+    start = time.perf_counter()
+    render.read_source_folders()
+    return time.perf_counter() - start
+
+
+def main():
+    entries = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+    with tempfile.TemporaryDirectory() as folder:
+        made = make_tree(folder, entries)
+        print(f'{made} entries')
+        walk(SourceTreeRender(), folder)  # warm the OS cache
+        for name, render in [('former', FormerSourceTreeRender()), ('scandir', SourceTreeRender())]:
+            elapsed = walk(render, folder)
+            print(f'{name}: {elapsed:.2f} s, {render.total_files} files')
+
+
+if __name__ == '__main__':
+    main()
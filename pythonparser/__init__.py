@@ -2,7 +2,7 @@ from __future__ import absolute_import, division, print_function, unicode_litera
 import sys, pythonparser.source, pythonparser.lexer, pythonparser.parser, pythonparser.diagnostic
 
 
-def parse_buffer(buffer, mode="exec", flags=[], version=None, engine=None):
+def parse_buffer(buffer, mode="exec", flags=[], version=None, engine=None, packrat=False, compiled=False):
     """
     Like :meth:`parse`, but accepts a :class:`source.Buffer` instead of
     source and filename, and returns comments as well.
@@ -22,7 +22,7 @@ def parse_buffer(buffer, mode="exec", flags=[], version=None, engine=None):
     if mode in ("single", "eval"):
         lexer.interactive = True
 
-    parser = pythonparser.parser.Parser(lexer, version, engine)
+    parser = pythonparser.parser.Parser(lexer, version, engine, packrat, compiled)
     parser.add_flags(flags)
 
     if mode == "exec":
@@ -34,7 +34,7 @@ def parse_buffer(buffer, mode="exec", flags=[], version=None, engine=None):
 
 
 def parse(source, filename="<unknown>", mode="exec",
-          flags=[], version=None, engine=None):
+          flags=[], version=None, engine=None, packrat=False, compiled=False):
     """
     Parse a string into an abstract syntax tree.
     This is the replacement for the built-in :meth:`..ast.parse`.
@@ -52,11 +52,15 @@ def parse(source, filename="<unknown>", mode="exec",
         syntax to recognize, ``sys.version_info[0:2]`` by default.
     :param engine: (:class:`diagnostic.Engine`) Diagnostic engine,
         a fresh one is created by default
+    :param packrat: (boolean) Cache the grammar rules' matches by token
+        index, so that backtracking does not parse the same tokens again
+    :param compiled: (boolean) Choose the grammar alternatives by the current
+        token instead of trying each of them; the result is the same
     :return: (:class:`ast.AST`) Abstract syntax tree
     :raise: :class:`diagnostic.Error`
         if the source code is not well-formed
     """
     ast, comments = parse_buffer(pythonparser.source.Buffer(source, filename),
-                                 mode, flags, version, engine)
+                                 mode, flags, version, engine, packrat, compiled)
     return ast
 
@@ -4,6 +4,7 @@ The :mod:`lexer` module concerns itself with tokenizing Python source.
 
 from __future__ import absolute_import, division, print_function, unicode_literals
 from . import source, diagnostic
+from collections import deque
 import regex as re
 import unicodedata
 import sys
@@ -24,6 +25,8 @@ class Token:
     :ivar kind: (string) token kind
     :ivar value: token value; None or a kind-specific class
     """
+    __slots__ = ("loc", "kind", "value")
+
     def __init__(self, loc, kind, value=None):
         self.loc, self.kind, self.value = loc, kind, value
 
@@ -120,7 +123,7 @@ class Lexer:
         self.new_line = True
         self.indent = [(0, source.Range(source_buffer, 0, 0), "")]
         self.comments = []
-        self.queue = []
+        self.queue = deque()
         self.parentheses = []
         self.curly_braces = []
         self.square_braces = []
@@ -250,7 +253,7 @@ class Lexer:
         if len(self.queue) == 0:
             self._refill(eof_token)
 
-        return self.queue.pop(0)
+        return self.queue.popleft()
 
     def peek(self, eof_token=False):
         """Same as :meth:`next`, except the token is not dequeued."""
@@ -6,6 +6,7 @@ The :mod:`parser` module concerns itself with parsing Python source.
 
 from __future__ import absolute_import, division, print_function, unicode_literals
 from functools import reduce
+import types
 from . import source, diagnostic, lexer, ast
 
 # A few notes about our approach to parsing:
@@ -45,16 +46,33 @@ from . import source, diagnostic, lexer, ast
 _all_rules = []
 _all_stmts = {}
 
+# Compiled grammar dispatch tables, see Parser.__init__; per Python version:
+# Alt rule -> {token kind: ((branch, compiled branch, may match), ...)},
+# Star or Plus rule -> the kinds the repeated rule can start with
+_dispatch_tables = {}
+
 # Generic LL parsing combinators
 class Unmatched:
     pass
 
 unmatched = Unmatched()
 
-def llrule(loc, expected, cases=1):
+# The grammar is built without coverage tracking: rules get a ``loc`` only
+# in the copy of this module instrumented by :mod:`pythonparser.coverage`.
+# Without a ``loc``, :func:`llrule` returns the rule itself instead of a
+# wrapper recording that it matched, and :func:`Alt` does not record which
+# branch matched, so there is no per-call cost outside of the coverage build.
+#
+# Besides ``expected``, the token kinds a rule can start with, every rule has
+# ``nullable``, true if the rule may match without its first token being one
+# of ``expected`` (e.g. it may match no tokens at all), and ``compiled``,
+# the same rule for the compiled mode (see :class:`Parser`), calling the
+# compiled inner rules and never recording coverage.
+def llrule(loc, expected, cases=1, nullable=lambda parser: True, compiled=None):
     if loc is None:
         def decorator(rule):
-            rule.expected = expected
+            rule.expected, rule.nullable, rule.compiled = \
+                expected, nullable, compiled or rule
             return rule
     else:
         def decorator(inner_rule):
@@ -67,8 +85,9 @@ def llrule(loc, expected, cases=1):
             else:
                 rule = inner_rule
 
-            rule.loc, rule.expected, rule.covered = \
-                loc, expected, [False] * cases
+            rule.loc, rule.expected, rule.nullable, rule.covered = \
+                loc, expected, nullable, [False] * cases
+            rule.compiled = compiled or inner_rule
             _all_rules.append(rule)
 
             return rule
@@ -83,8 +102,7 @@ def action(inner_rule, loc=None):
 
     Similar to attaching semantic actions to rules in traditional parser generators.
     """
-    def decorator(mapper):
-        @llrule(loc, inner_rule.expected)
+    def build(inner_rule, mapper):
         def outer_rule(parser):
             result = inner_rule(parser)
             if result is unmatched:
@@ -94,25 +112,29 @@ def action(inner_rule, loc=None):
             else:
                 return mapper(parser, result)
         return outer_rule
+
+    def decorator(mapper):
+        return llrule(loc, inner_rule.expected, nullable=inner_rule.nullable,
+                      compiled=build(inner_rule.compiled, mapper))(build(inner_rule, mapper))
     return decorator
 
 def Eps(value=None, loc=None):
     """A rule that accepts no tokens (epsilon) and returns ``value``."""
-    @llrule(loc, lambda parser: [])
+    @llrule(loc, lambda parser: [], nullable=lambda parser: True)
     def rule(parser):
         return value
     return rule
 
 def Tok(kind, loc=None):
     """A rule that accepts a token of kind ``kind`` and returns it, or returns None."""
-    @llrule(loc, lambda parser: [kind])
+    @llrule(loc, lambda parser: [kind], nullable=lambda parser: False)
     def rule(parser):
         return parser._accept(kind)
     return rule
 
 def Loc(kind, loc=None):
     """A rule that accepts a token of kind ``kind`` and returns its location, or returns None."""
-    @llrule(loc, lambda parser: [kind])
+    @llrule(loc, lambda parser: [kind], nullable=lambda parser: False)
     def rule(parser):
         result = parser._accept(kind)
         if result is unmatched:
@@ -122,55 +144,100 @@ def Loc(kind, loc=None):
 
 def Rule(name, loc=None):
     """A proxy for a rule called ``name`` which may not be yet defined."""
-    @llrule(loc, lambda parser: getattr(parser, name).expected(parser))
+    def compiled_rule(parser):
+        # the compiled rule is looked up once per parser
+        method = parser._rules.get(name)
+        if method is None:
+            method = parser._rules[name] = getattr(parser, name).compiled
+        if parser._memo is None:
+            return method(parser)
+
+        memo = parser._memo_at(parser._index)
+        if name in memo:
+            result, parser._index = memo[name]
+            parser._token = parser._tokens[parser._index - parser._offset]
+            return result
+        result = method(parser)
+        if result is not unmatched:
+            memo[name] = (result, parser._index)
+        return result
+
+    @llrule(loc, lambda parser: getattr(parser, name).expected(parser),
+            nullable=lambda parser: getattr(parser, name).nullable(parser),
+            compiled=compiled_rule)
     def rule(parser):
-        return getattr(parser, name)()
+        if parser._memo is None:
+            return getattr(parser, name)()
+
+        # packrat mode, see Parser._memo_at
+        memo = parser._memo_at(parser._index)
+        if name in memo:
+            result, parser._index = memo[name]
+            parser._token = parser._tokens[parser._index - parser._offset]
+            return result
+        result = getattr(parser, name)()
+        if result is not unmatched:
+            memo[name] = (result, parser._index)
+        return result
     return rule
 
 def Expect(inner_rule, loc=None):
     """A rule that executes ``inner_rule`` and emits a diagnostic error if it returns None."""
-    @llrule(loc, inner_rule.expected)
-    def rule(parser):
-        result = inner_rule(parser)
-        if result is unmatched:
-            expected = reduce(list.__add__, [rule.expected(parser) for rule in parser._errrules])
-            expected = list(sorted(set(expected)))
+    def build(inner_rule):
+        def rule(parser):
+            result = inner_rule(parser)
+            if result is unmatched:
+                expected = reduce(list.__add__, [rule.expected(parser) for rule in parser._errrules])
+                expected = list(sorted(set(expected)))
 
-            if len(expected) > 1:
-                expected = " or ".join([", ".join(expected[0:-1]), expected[-1]])
-            elif len(expected) == 1:
-                expected = expected[0]
-            else:
-                expected = "(impossible)"
-
-            error_tok = parser._tokens[parser._errindex]
-            error = diagnostic.Diagnostic(
-                "fatal", "unexpected {actual}: expected {expected}",
-                {"actual": error_tok.kind, "expected": expected},
-                error_tok.loc)
-            parser.diagnostic_engine.process(error)
-        return result
-    return rule
+                if len(expected) > 1:
+                    expected = " or ".join([", ".join(expected[0:-1]), expected[-1]])
+                elif len(expected) == 1:
+                    expected = expected[0]
+                else:
+                    expected = "(impossible)"
+
+                if parser._errindex == -1:
+                    # nothing backtracked yet, the last token read
+                    error_tok = parser._tokens[-1]
+                else:
+                    error_tok = parser._errtoken
+                error = diagnostic.Diagnostic(
+                    "fatal", "unexpected {actual}: expected {expected}",
+                    {"actual": error_tok.kind, "expected": expected},
+                    error_tok.loc)
+                parser.diagnostic_engine.process(error)
+            return result
+        return rule
+
+    return llrule(loc, inner_rule.expected, nullable=inner_rule.nullable,
+                  compiled=build(inner_rule.compiled))(build(inner_rule))
 
 def Seq(first_rule, *rest_of_rules, **kwargs):
     """
     A rule that accepts a sequence of tokens satisfying ``rules`` and returns a tuple
     containing their return values, or None if the first rule was not satisfied.
     """
-    @llrule(kwargs.get("loc", None), first_rule.expected)
-    def rule(parser):
-        result = first_rule(parser)
-        if result is unmatched:
-            return result
-
-        results = [result]
-        for rule in rest_of_rules:
-            result = rule(parser)
+    def build(first_rule, rest_of_rules):
+        def rule(parser):
+            result = first_rule(parser)
             if result is unmatched:
                 return result
-            results.append(result)
-        return tuple(results)
-    return rule
+
+            results = [result]
+            for rule in rest_of_rules:
+                result = rule(parser)
+                if result is unmatched:
+                    return result
+                results.append(result)
+            return tuple(results)
+        return rule
+
+    # ``expected`` lists only the first rule's kinds, so a sequence starting
+    # with a nullable rule is nullable as well
+    return llrule(kwargs.get("loc", None), first_rule.expected, nullable=first_rule.nullable,
+                  compiled=build(first_rule.compiled, [rule.compiled for rule in rest_of_rules]))(
+        build(first_rule, rest_of_rules))
 
 def SeqN(n, *inner_rules, **kwargs):
     """
@@ -190,8 +257,30 @@ def Alt(*inner_rules, **kwargs):
     """
     loc = kwargs.get("loc", None)
     expected = lambda parser: reduce(list.__add__, map(lambda x: x.expected(parser), inner_rules))
+    nullable = lambda parser: any([x.nullable(parser) for x in inner_rules])
+
+    def compiled_rule(parser):
+        # the branches that cannot start with the current token are not
+        # tried, but recorded for the error diagnostic as if they failed
+        data = parser._save()
+        table = parser._dispatch.get(rule)
+        if table is None:
+            table = parser._dispatch[rule] = _branch_table(parser, inner_rules)
+        for inner_rule, compiled_inner_rule, candidate in \
+                table.get(parser._token.kind) or table[None]:
+            if candidate:
+                result = compiled_inner_rule(parser)
+                if result is not unmatched:
+                    parser._release()
+                    return result
+            if candidate or data >= parser._errindex:
+                parser._restore(data, rule=inner_rule)
+        parser._release()
+        return unmatched
+
     if loc is not None:
-        @llrule(loc, expected, cases=len(inner_rules))
+        @llrule(loc, expected, cases=len(inner_rules), nullable=nullable,
+                compiled=compiled_rule)
         def rule(parser):
             data = parser._save()
             for idx, inner_rule in enumerate(inner_rules):
@@ -200,10 +289,13 @@ def Alt(*inner_rules, **kwargs):
                     parser._restore(data, rule=inner_rule)
                 else:
                     rule.covered[idx] = True
+                    parser._release()
                     return result
+            parser._release()
             return unmatched
     else:
-        @llrule(loc, expected, cases=len(inner_rules))
+        @llrule(loc, expected, cases=len(inner_rules), nullable=nullable,
+                compiled=compiled_rule)
         def rule(parser):
             data = parser._save()
             for inner_rule in inner_rules:
@@ -211,7 +303,9 @@ def Alt(*inner_rules, **kwargs):
                 if result is unmatched:
                     parser._restore(data, rule=inner_rule)
                 else:
+                    parser._release()
                     return result
+            parser._release()
             return unmatched
     return rule
 
@@ -224,7 +318,24 @@ def Star(inner_rule, loc=None):
     A rule that accepts a sequence of tokens satisfying ``inner_rule`` zero or more times,
     and returns the returned values in a :class:`list`.
     """
-    @llrule(loc, lambda parser: [])
+    compiled_inner_rule = inner_rule.compiled
+    def compiled_rule(parser):
+        first = _repeated_kinds(parser, rule, inner_rule)
+        results = []
+        while True:
+            data = parser._save()
+            if first is not None and parser._token.kind not in first:
+                result = unmatched
+            else:
+                result = compiled_inner_rule(parser)
+            if result is unmatched:
+                parser._restore(data, rule=inner_rule)
+                parser._release()
+                return results
+            parser._release()
+            results.append(result)
+
+    @llrule(loc, lambda parser: [], nullable=lambda parser: True, compiled=compiled_rule)
     def rule(parser):
         results = []
         while True:
@@ -232,7 +343,9 @@ def Star(inner_rule, loc=None):
             result = inner_rule(parser)
             if result is unmatched:
                 parser._restore(data, rule=inner_rule)
+                parser._release()
                 return results
+            parser._release()
             results.append(result)
     return rule
 
@@ -241,7 +354,28 @@ def Plus(inner_rule, loc=None):
     A rule that accepts a sequence of tokens satisfying ``inner_rule`` one or more times,
     and returns the returned values in a :class:`list`.
     """
-    @llrule(loc, inner_rule.expected)
+    compiled_inner_rule = inner_rule.compiled
+    def compiled_rule(parser):
+        result = compiled_inner_rule(parser)
+        if result is unmatched:
+            return result
+
+        first = _repeated_kinds(parser, rule, inner_rule)
+        results = [result]
+        while True:
+            data = parser._save()
+            if first is not None and parser._token.kind not in first:
+                result = unmatched
+            else:
+                result = compiled_inner_rule(parser)
+            if result is unmatched:
+                parser._restore(data, rule=inner_rule)
+                parser._release()
+                return results
+            parser._release()
+            results.append(result)
+
+    @llrule(loc, inner_rule.expected, nullable=inner_rule.nullable, compiled=compiled_rule)
     def rule(parser):
         result = inner_rule(parser)
         if result is unmatched:
@@ -253,10 +387,36 @@ def Plus(inner_rule, loc=None):
             result = inner_rule(parser)
             if result is unmatched:
                 parser._restore(data, rule=inner_rule)
+                parser._release()
                 return results
+            parser._release()
             results.append(result)
     return rule
 
+def _first_kinds(parser, rule):
+    # the token kinds the rule can start with, None if it is nullable
+    if rule.nullable(parser):
+        return None
+    return frozenset(rule.expected(parser))
+
+def _branch_table(parser, inner_rules):
+    # for each token kind, the Alt branches with a flag telling whether
+    # the branch may match; the None key is for the kinds no branch starts with
+    firsts = [_first_kinds(parser, inner_rule) for inner_rule in inner_rules]
+    table = {None: tuple((inner_rule, inner_rule.compiled, first is None)
+                         for inner_rule, first in zip(inner_rules, firsts))}
+    for kind in set().union(*[first for first in firsts if first is not None]):
+        table[kind] = tuple((inner_rule, inner_rule.compiled, first is None or kind in first)
+                            for inner_rule, first in zip(inner_rules, firsts))
+    return table
+
+def _repeated_kinds(parser, rule, inner_rule):
+    # the kinds a Star or Plus repetition can start with,
+    # None if every repetition has to be tried
+    if rule not in parser._dispatch:
+        parser._dispatch[rule] = _first_kinds(parser, inner_rule)
+    return parser._dispatch[rule]
+
 class commalist(list):
     __slots__ = ("trailing_comma",)
 
@@ -271,36 +431,41 @@ def List(inner_rule, separator_tok, trailing, leading=True, loc=None):
         # This doesn't yield itself to combinators above, because disambiguating
         # another iteration of the Kleene star and the trailing separator
         # requires two lookahead tokens (naively).
-        separator_rule = Tok(separator_tok)
-        @llrule(loc, inner_rule.expected)
-        def rule(parser):
-            results = commalist()
-
-            if leading:
-                result = inner_rule(parser)
-                if result is unmatched:
-                    return result
-                else:
-                    results.append(result)
-
-            while True:
-                result = separator_rule(parser)
-                if result is unmatched:
-                    results.trailing_comma = None
-                    return results
+        def build(inner_rule, separator_rule):
+            def rule(parser):
+                results = commalist()
+
+                if leading:
+                    result = inner_rule(parser)
+                    if result is unmatched:
+                        return result
+                    else:
+                        results.append(result)
+
+                while True:
+                    result = separator_rule(parser)
+                    if result is unmatched:
+                        results.trailing_comma = None
+                        return results
+
+                    result_1 = inner_rule(parser)
+                    if result_1 is unmatched:
+                        results.trailing_comma = result
+                        return results
+                    else:
+                        results.append(result_1)
+            return rule
 
-                result_1 = inner_rule(parser)
-                if result_1 is unmatched:
-                    results.trailing_comma = result
-                    return results
-                else:
-                    results.append(result_1)
-        return rule
+        separator_rule = Tok(separator_tok)
+        return llrule(loc, inner_rule.expected,
+                      nullable=inner_rule.nullable if leading else lambda parser: True,
+                      compiled=build(inner_rule.compiled, separator_rule.compiled))(
+            build(inner_rule, separator_rule))
 
 # Python AST specific parser combinators
 def Newline(loc=None):
     """A rule that accepts token of kind ``newline`` and returns an empty list."""
-    @llrule(loc, lambda parser: ["newline"])
+    @llrule(loc, lambda parser: ["newline"], nullable=lambda parser: False)
     def rule(parser):
         result = parser._accept("newline")
         if result is unmatched:
@@ -352,27 +517,75 @@ def BeginEnd(begin_tok, inner_rule, end_tok, empty=None, loc=None):
 class Parser(object):
 
     # Generic LL parsing methods
-    def __init__(self, lexer, version, diagnostic_engine):
+    def __init__(self, lexer, version, diagnostic_engine, packrat=False, compiled=False):
         self._init_version(version)
         self.diagnostic_engine = diagnostic_engine
 
         self.lexer     = lexer
         self._tokens   = []
+        self._offset   = 0
+        self._saved    = []
         self._index    = -1
         self._errindex = -1
+        self._errtoken = None
         self._errrules = []
+        # packrat cache: token index -> {rule name: (result, end index)}
+        self._memo     = {} if packrat else None
+        if compiled:
+            self._rules    = {}
+            self._dispatch = _dispatch_tables.setdefault(version, {})
+            for name in ("file_input", "single_input", "eval_input"):
+                setattr(self, name, types.MethodType(getattr(self, name).compiled, self))
         self._advance()
 
+    # In compiled mode, the entry points run the rules' ``compiled`` forms,
+    # where Rule proxies are resolved once per parser (``_rules``), and Alt,
+    # Star and Plus choose the rules to try by the current token's kind
+    # (``_dispatch``), using the FIRST sets computed from ``expected`` and
+    # ``nullable`` once per version, instead of calling every branch.
+    # The interpreted rules never read these, so they are only set on
+    # compiled parsers.
+    _rules    = None
+    _dispatch = None
+
+    # Only the tokens a live backtrack point may return to are kept:
+    # ``_tokens`` is a window starting at token number ``_offset``, and
+    # every :meth:`_save` is paired with a :meth:`_release` once the
+    # combinator can no longer :meth:`_restore` to it. The window grows
+    # with the longest backtracked rule, not with the source.
+    _min_trim = 256
+
+    # In packrat mode, successful matches of named rules (:func:`Rule`) are
+    # cached by token index, so a rule retried by a backtracking combinator
+    # at the same index returns at once. Failures are not cached, they
+    # record the rules expected for the error diagnostic. The cache is
+    # trimmed along with the token window and holds at most ``_memo_limit``
+    # token indices.
+    _memo_limit = 4096
+
+    def _memo_at(self, index):
+        memo = self._memo.get(index)
+        if memo is None:
+            memo = self._memo[index] = {}
+            if len(self._memo) > self._memo_limit:
+                del self._memo[next(iter(self._memo))]
+        return memo
+
     def _save(self):
+        self._saved.append(self._index)
         return self._index
 
+    def _release(self):
+        self._saved.pop()
+
     def _restore(self, data, rule):
         self._index = data
-        self._token = self._tokens[self._index]
+        self._token = self._tokens[self._index - self._offset]
 
         if self._index > self._errindex:
             # We have advanced since last error
             self._errindex = self._index
+            self._errtoken = self._token
             self._errrules = [rule]
         elif self._index == self._errindex:
             # We're at the same place as last error
@@ -384,9 +597,26 @@ class Parser(object):
 
     def _advance(self):
         self._index += 1
-        if self._index == len(self._tokens):
+        position = self._index - self._offset
+        if position == len(self._tokens):
+            if position >= self._min_trim:
+                position -= self._trim()
             self._tokens.append(self.lexer.next(eof_token=True))
-        self._token = self._tokens[self._index]
+        self._token = self._tokens[position]
+
+    def _trim(self):
+        # drop the tokens behind the oldest backtrack point, if they make
+        # at least a half of the window; returns the count dropped
+        oldest = self._saved[0] if self._saved else self._index
+        count = oldest - self._offset
+        if count < len(self._tokens) // 2:
+            return 0
+        del self._tokens[:count]
+        self._offset = oldest
+        if self._memo:
+            for index in [index for index in self._memo if index < oldest]:
+                del self._memo[index]
+        return count
 
     def _accept(self, expected_kind):
         if self._token.kind == expected_kind:
@@ -4,7 +4,7 @@ from __future__ import absolute_import, division, print_function, unicode_litera
 from . import test_utils
 from .. import source, lexer, diagnostic, ast, coverage
 from ..coverage import parser
-import unittest, sys, re, ast as pyast
+import unittest, sys, re, gc, tracemalloc, ast as pyast
 
 BytesOnly = test_utils.BytesOnly
 UnicodeOnly = test_utils.UnicodeOnly
@@ -21,7 +21,9 @@ class ParserTestCase(unittest.TestCase):
 
     versions = [(2, 6), (2, 7), (3, 0), (3, 1), (3, 2), (3, 3), (3, 4), (3, 5)]
 
-    def parser_for(self, code, version, interactive=False):
+    compiled = False
+
+    def parser_for(self, code, version, interactive=False, packrat=False):
         code = code.replace("·", "\n")
 
         self.source_buffer = source.Buffer(code, str(version))
@@ -37,7 +39,7 @@ class ParserTestCase(unittest.TestCase):
             return token
         self.lexer.next = lexer_next
 
-        self.parser = parser.Parser(self.lexer, version, self.engine)
+        self.parser = parser.Parser(self.lexer, version, self.engine, packrat, self.compiled)
         return self.parser
 
     def flatten_ast(self, node):
@@ -2092,3 +2094,82 @@ class ParserTestCase(unittest.TestCase):
         self.assertDiagnosesUnexpected(
             "x + ,", ",",
             "    ^ 0")
+
+    #
+    # COVERAGE
+    #
+
+    def test_coverage_build(self):
+        from .. import parser as plain_parser
+        self.assertEqual([], plain_parser._all_rules)
+        self.assertFalse(hasattr(plain_parser.Parser.file_input, "covered"))
+        self.assertFalse(hasattr(plain_parser.Parser.argument, "covered"))
+        self.assertGreater(len(parser._all_rules), 0)
+        self.assertTrue(hasattr(parser.Parser.file_input, "covered"))
+
+    #
+    # PACKRAT
+    #
+
+    def test_packrat(self):
+        code = "x = {a: b[1:2], c: {d, e}}·" \
+               "f(x, *y, k=[z for z in {1} if z], **w)[a:b, ::c]·" \
+               "def g(a, b=1, *c):·  return (lambda d=(b, c): d[a] if a else {c})(a)·"
+        for version in self.versions:
+            if version < (3, 2):
+                continue
+            expected = self.flatten_ast(self.parser_for(code, version).file_input())
+            packrat_parser = self.parser_for(code, version, packrat=True)
+            self.assertEqual(expected, self.flatten_ast(packrat_parser.file_input()))
+            self.assertGreater(len(packrat_parser._memo), 0)
+
+    def test_packrat_limit(self):
+        code = "x = {a: [b, (c, d)]}·" * 200
+        packrat_parser = self.parser_for(code, (3, 5), packrat=True)
+        packrat_parser._memo_limit = 50
+        self.assertEqual(200, len(packrat_parser.file_input().body))
+        self.assertLessEqual(len(packrat_parser._memo), 50)
+
+    #
+    # MEMORY
+    #
+
+    def parse_memory(self, code, version):
+        # memory kept by the AST and the parse's peak memory
+        gc.collect()
+        tracemalloc.start()
+        try:
+            parser = self.parser_for(code, version)
+            ast = parser.file_input()
+            peak = tracemalloc.get_traced_memory()[1]
+            del parser
+            self.parser = self.lexer = None
+            gc.collect()
+            return tracemalloc.get_traced_memory()[0], peak
+        finally:
+            tracemalloc.stop()
+
+    def test_token_window(self):
+        code = "def f(x):·  if x:·    y = [x, x + 1]·  return y·" * 500 + "z = f(1)·"
+        window = []
+        parser = self.parser_for(code, (3, 5))
+        old_next = self.lexer.next
+        def lexer_next(**args):
+            window.append(len(parser._tokens))
+            return old_next(**args)
+        self.lexer.next = lexer_next
+        ast = parser.file_input()
+        self.assertEqual(501, len(ast.body))
+        self.assertLess(max(window), 1000)
+
+    def test_peak_memory(self):
+        # the tokens kept at the peak would take about a half of the AST
+        # memory if the parser kept every token
+        code = "x = y + [z, 1] * 2·" * 3000
+        ast_memory, peak_memory = self.parse_memory(code, (3, 5))
+        self.assertLess(peak_memory - ast_memory, ast_memory // 4)
+
+class CompiledParserTestCase(ParserTestCase):
+    """The same tests with the compiled grammar dispatch."""
+
+    compiled = True
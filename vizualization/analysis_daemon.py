@@ -0,0 +1,219 @@
+# keeps the parsed sources and the copypastes found in memory, polls the
+# source folders for changes and answers JSON requests over a Unix socket.
+# Run from the repository root:
+#   python -m vizualization.analysis_daemon serve /tmp/copypastanet.sock folder [folder ...]
+#   python -m vizualization.analysis_daemon query /tmp/copypastanet.sock status
+#   python -m vizualization.analysis_daemon query /tmp/copypastanet.sock copypastes --file path.py
+#
+# Requests and responses are JSON objects, one per line:
+#   {"command": "status"}
+#   {"command": "copypastes", "file": "path.py", "limit": 100} - "file" and "limit" are optional
+#   {"command": "update"} - check the sources for changes right away
+#   {"command": "stop"}
+import argparse
+import asyncio
+import json
+import os
+import socket
+import stat
+import sys
+from typing import List, Dict, Any, Optional
+
+from astexplorer.copypaste import Copypaste
+from vizualization.source_tree_render import SourceTreeRender
+
+
+class AnalysisSnapshot:
+    # the render's results, requests are answered from the snapshot while
+    # the render is being updated
+    def __init__(self, render: SourceTreeRender, version: int):
+        self.version = version
+        self.files = render.files_ok
+        self.functions = len(render.functions)
+        self.errors = dict(render.file_parse_errors)
+        self.copypastes = [self.serialize_copypaste(c) for c in render.copypastes]
+        # { absolute file path: copypastes having a function in the file }
+        self.cps_by_path = {}  # type: Dict[str, List[Dict[str, Any]]]
+        for cp in self.copypastes:
+            self.cps_by_path.setdefault(os.path.abspath(cp['file_a']), []).append(cp)
+            if cp['file_b'] != cp['file_a']:
+                self.cps_by_path.setdefault(os.path.abspath(cp['file_b']), []).append(cp)
+
+    @classmethod
+    def serialize_copypaste(cls, c: Copypaste) -> Dict[str, Any]:
+        return {'file_a': c.func_a.file, 'function_a': c.func_a.name,
+                'file_b': c.func_b.file, 'function_b': c.func_b.name,
+                'start_index_a': c.start_index_a, 'end_index_a': c.end_index_a,
+                'start_index_b': c.node_b.line_start,
+                'count': c.count, 'weight': c.weight}
+
+
+class AnalysisDaemon:
+    def __init__(self, render: SourceTreeRender, socket_path: str, poll_interval: float = 1.0):
+        # render should have explored the sources already
+        self.render = render
+        self.socket_path = socket_path
+        # seconds between the source folders' checks
+        self.poll_interval = poll_interval
+        self.snapshot = AnalysisSnapshot(render, 0)
+        self.server: Optional[asyncio.AbstractServer] = None
+        self.stopped: Optional[asyncio.Event] = None
+        self.update_lock: Optional[asyncio.Lock] = None
+
+    async def run(self) -> None:
+        # serves until the "stop" request
+        self.stopped = asyncio.Event()
+        self.update_lock = asyncio.Lock()
+        # a socket left by a former daemon is replaced, any other file
+        # or a socket some process listens on is kept
+        if self.is_socket(self.socket_path):
+            if self.is_socket_listened(self.socket_path):
+                raise FileExistsError(f'"{self.socket_path}" is listened by another process')
+            os.remove(self.socket_path)
+        elif os.path.lexists(self.socket_path):
+            raise FileExistsError(f'"{self.socket_path}" exists and is not a socket')
+        self.server = await asyncio.start_unix_server(self.handle_client, path=self.socket_path)
+        watcher = asyncio.create_task(self.watch_sources())
+        try:
+            await self.stopped.wait()
+        finally:
+            watcher.cancel()
+            self.server.close()
+            await self.server.wait_closed()
+            if self.is_socket(self.socket_path):
+                os.remove(self.socket_path)
+
+    def stop(self) -> None:
+        self.stopped.set()
+
+    @classmethod
+    def is_socket(cls, path: str) -> bool:
+        try:
+            return stat.S_ISSOCK(os.lstat(path).st_mode)
+        except FileNotFoundError:
+            return False
+
+    @classmethod
+    def is_socket_listened(cls, path: str) -> bool:
+        # only a refused connection means the socket is stale
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(path)
+        except ConnectionRefusedError:
+            return False
+        finally:
+            probe.close()
+        return True
+
+    async def watch_sources(self) -> None:
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.update_sources()
+            except Exception as e:
+                print(f'Error updating sources: {e}')
+
+    async def update_sources(self) -> bool:
+        # parsing and comparing run in a thread, requests are served meanwhile
+        async with self.update_lock:
+            loop = asyncio.get_running_loop()
+            if not await loop.run_in_executor(None, self.render.has_source_changes):
+                return False
+            await loop.run_in_executor(None, self.render.update_sources)
+            self.snapshot = await loop.run_in_executor(
+                None, AnalysisSnapshot, self.render, self.snapshot.version + 1)
+            return True
+
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    response = await self.handle_request(json.loads(line))
+                except Exception as e:
+                    response = {'error': str(e)}
+                writer.write(json.dumps(response).encode('utf-8') + b'\n')
+                await writer.drain()
+        finally:
+            writer.close()
+
+    async def handle_request(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        command = request.get('command')
+        snapshot = self.snapshot
+        if command == 'status':
+            return {'version': snapshot.version, 'files': snapshot.files,
+                    'functions': snapshot.functions, 'copypastes': len(snapshot.copypastes),
+                    'errors': snapshot.errors}
+        if command == 'copypastes':
+            copypastes = snapshot.copypastes
+            if request.get('file'):
+                copypastes = snapshot.cps_by_path.get(os.path.abspath(request['file']), [])
+            if request.get('limit'):
+                copypastes = copypastes[:request['limit']]
+            return {'version': snapshot.version, 'copypastes': copypastes}
+        if command == 'update':
+            updated = await self.update_sources()
+            return {'version': self.snapshot.version, 'updated': updated}
+        if command == 'stop':
+            self.stop()
+            return {'stopped': True}
+        raise ValueError(f'unknown command: {command}')
+
+
+async def send_request(socket_path: str, request: Dict[str, Any]) -> Dict[str, Any]:
+    reader, writer = await asyncio.open_unix_connection(socket_path)
+    try:
+        writer.write(json.dumps(request).encode('utf-8') + b'\n')
+        await writer.drain()
+        return json.loads(await reader.readline())
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+
+def query_daemon(socket_path: str, request: Dict[str, Any]) -> Dict[str, Any]:
+    return asyncio.run(send_request(socket_path, request))
+
+
+def main(args: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Copypaste analysis daemon')
+    commands = parser.add_subparsers(dest='command', required=True)
+    serve_parser = commands.add_parser('serve', help='explore the folders and serve requests')
+    serve_parser.add_argument('socket')
+    serve_parser.add_argument('folders', nargs='+')
+    serve_parser.add_argument('--poll', type=float, default=1.0, help='seconds between checks')
+    serve_parser.add_argument('--cache-folder', default='')
+    serve_parser.add_argument('--parse-workers', type=int, default=0)
+    query_parser = commands.add_parser('query', help='send a request to the daemon')
+    query_parser.add_argument('socket')
+    query_parser.add_argument('request', choices=['status', 'copypastes', 'update', 'stop'])
+    query_parser.add_argument('--file')
+    query_parser.add_argument('--limit', type=int)
+    options = parser.parse_args(args)
+
+    if options.command == 'serve':
+        render = SourceTreeRender()
+        render.explore_sources(options.folders, parse_workers=options.parse_workers,
+                               cache_folder=options.cache_folder)
+        try:
+            asyncio.run(AnalysisDaemon(render, options.socket, options.poll).run())
+        except FileExistsError as e:
+            print(e, file=sys.stderr)
+            return 1
+        return 0
+
+    request = {'command': options.request}
+    if options.file:
+        # the daemon may run in another folder
+        request['file'] = os.path.abspath(options.file)
+    if options.limit:
+        request['limit'] = options.limit
+    response = query_daemon(options.socket, request)
+    print(json.dumps(response, indent=2))
+    return 1 if 'error' in response else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,5 +1,8 @@
 import html
-from typing import Optional, Set
+import io
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import Optional, Set, List, Iterable, Iterator, Tuple, NamedTuple, TextIO
 import regex as re
 import os
 import codecs
@@ -7,21 +10,81 @@ import codecs
 from vizualization.folder_map import FolderNode
 from vizualization.source_tree_render import SourceTreeRender
 
+# copypaste's position in the file and its description
+CopypasteSpan = NamedTuple('CopypasteSpan', [('start_index_a', int),
+                                             ('end_index_a', int),
+                                             ('hint', str)])
+
+# everything needed to render a source file's page in another process
+FilePageJob = NamedTuple('FilePageJob', [('output_path', str),
+                                         ('header', str),
+                                         ('footer', str),
+                                         ('source_path', str),
+                                         ('spans', List[CopypasteSpan])])
+
+
+def write_page(output_path: str, text: str) -> None:
+    with open(output_path, 'wb') as fw:
+        fw.write(text.encode('utf-8'))
+
+
+def render_file_page(job: FilePageJob) -> None:
+    with codecs.open(job.source_path, 'r', encoding='utf-8') as fr:
+        full_text = fr.read()
+
+    lines = [job.header]
+    line_index = 1
+    for line, line_spans in HtmlSourceTreeRender.iterate_lines(full_text, job.spans):
+        # list all the copypastes the line belongs to
+        cpx_hint = '\n\n'.join([c.hint for c in line_spans])
+
+        line_num_str = f'{line_index:03}'
+        line_index += 1
+        line_printed = f'{line_num_str}&nbsp;&nbsp;'
+        if cpx_hint:
+            line_printed += f'<a class="copy-line" href="#" title="{html.escape(cpx_hint)}">'
+        line_printed += html.escape(line)
+        if cpx_hint:
+            line_printed += '</a>'
+        line_printed += '<br/>\n'
+        lines.append(line_printed)
+    lines.append(job.footer)
+    write_page(job.output_path, ''.join(lines))
+
 
 class HtmlSourceTreeRender(SourceTreeRender):
     REG_ILLEGAL_PATH_CHARS = re.compile(r'[^a-z\.0-9_]', re.IGNORECASE)
 
+    def __init__(self):
+        super().__init__()
+        # processes rendering source files' pages, 0 or 1 means "render in this process"
+        self.render_workers = 0
+
     def render(self):
         self.render_styles()
         self.give_unique_filenames(self.root_folder, None, set())
         self.root_folder.plain_file_name = 'index.html'
+        if self.render_workers > 1:
+            self.render_parallel()
+            return
         self.render_folder_or_file(self.root_folder)
 
-    def render_folder_or_file(self, node: FolderNode):
+    def render_parallel(self):
+        # folders' pages are rendered here, source files' pages - in the pool
+        jobs = []  # type: List[FilePageJob]
+        self.render_folder_or_file(self.root_folder, jobs)
+        chunk_size = max(1, len(jobs) // (self.render_workers * 8))
+        with ProcessPoolExecutor(max_workers=self.render_workers) as executor:
+            for _ in executor.map(render_file_page, jobs, chunksize=chunk_size):
+                pass
+
+    def render_folder_or_file(self, node: FolderNode, jobs: Optional[List[FilePageJob]] = None):
         if not node.is_file:
             self.render_folder(node)
             for child in node.children:
-                self.render_folder_or_file(child)
+                self.render_folder_or_file(child, jobs)
+        elif jobs is not None:
+            jobs.append(self.get_file_page_job(node))
         else:
             self.render_file(node)
 
@@ -53,61 +116,69 @@ class HtmlSourceTreeRender(SourceTreeRender):
             self.render_footer(fw)
 
     def render_file(self, node: FolderNode):
+        render_file_page(self.get_file_page_job(node))
+
+    def get_file_page_job(self, node: FolderNode) -> FilePageJob:
         copypastes = self.cps_by_path.get(node.full_path, [])
         error = self.file_parse_errors.get(node.full_path, '')
 
-        with self.open_file_to_write(node.plain_file_name) as fw:
-            self.render_head(node, fw)
-            self.render_navigation_path(node, fw)
-            if node.ancestors:
-                fw.write(f'''    <p><a href="{node.ancestors[-1].plain_file_name}">../</a></p><br/>\n''')
-
-            if error:
-                fw.write('    <h3>There were errors:</h3>\n')
-                fw.write(f'    <p style="color:#550000">{html.escape(error)}</p>\n<br/>\n')
-
-            fw.write('''    <pre>\n''')
-            line_index = 1
-            with codecs.open(node.full_path, 'r', encoding='utf-8') as fr:
-                full_text = fr.read()
-
-            line_start_index = 0
-            line_end_index = full_text.find('\n')
-            while True:
-                cpx_hint = ''
-                line = full_text[line_start_index:] if line_end_index < 0 else \
-                    full_text[line_start_index:line_end_index]
-                # is there some copypaste?
-                for c in copypastes:
-                    is_in = line_start_index <= c.start_index_a <= line_end_index  # OK
-                    is_in = is_in or (line_start_index <= c.end_index_a <= line_end_index)
-                    is_in = is_in or (c.start_index_a <= line_start_index <= c.end_index_a)
-                    is_in = is_in or (c.start_index_a <= line_end_index <= c.end_index_a)
-                    if is_in:
-                        cpx_hint = str(c)
-
-                line_num_str = f'{line_index:03}'
-                line_index += 1
-                line_printed = f'{line_num_str}&nbsp;&nbsp;'
-                if cpx_hint:
-                    line_printed += f'<a class="copy-line" href="#" title="{html.escape(cpx_hint)}">'
-                line_printed += html.escape(line)
-                if cpx_hint:
-                    line_printed += '</a>'
-                line_printed += '<br/>\n'
-                fw.write(line_printed)
-
-                if line_end_index < 0:
-                    break
-                line_start_index = line_end_index + 1
-                line_end_index = full_text.find('\n', line_start_index)
-
-            fw.write('''\n    </pre>\n''')
-            self.render_footer(fw)
+        fw = io.StringIO()
+        self.render_head(node, fw)
+        self.render_navigation_path(node, fw)
+        if node.ancestors:
+            fw.write(f'''    <p><a href="{node.ancestors[-1].plain_file_name}">../</a></p><br/>\n''')
+
+        if error:
+            fw.write('    <h3>There were errors:</h3>\n')
+            fw.write(f'    <p style="color:#550000">{html.escape(error)}</p>\n<br/>\n')
+
+        fw.write('''    <pre>\n''')
+        header = fw.getvalue()
+
+        fw = io.StringIO()
+        fw.write('''\n    </pre>\n''')
+        self.render_footer(fw)
+        footer = fw.getvalue()
+
+        spans = [CopypasteSpan(c.start_index_a, c.end_index_a, str(c)) for c in copypastes]
+        return FilePageJob(os.path.join(self.output_folder, node.plain_file_name),
+                           header, footer, node.full_path, spans)
+
+    @classmethod
+    def iterate_lines(cls,
+                      full_text: str,
+                      copypastes: List[CopypasteSpan]) -> Iterable[Tuple[str, List[CopypasteSpan]]]:
+        # yields each line of the text with the copypastes overlapping the line:
+        # the copypastes are sorted by their start once and swept along the lines
+        spans = sorted(copypastes, key=lambda c: c.start_index_a)
+        next_span = 0
+        active = []  # type: List[CopypasteSpan]
+
+        line_start_index = 0
+        line_end_index = full_text.find('\n')
+        while True:
+            line_end = len(full_text) if line_end_index < 0 else line_end_index
+            line = full_text[line_start_index:line_end]
+            # add copypastes starting before the line's end
+            while next_span < len(spans) and spans[next_span].start_index_a <= line_end:
+                active.append(spans[next_span])
+                next_span += 1
+            # and drop those ended before the line's start
+            if active:
+                active = [c for c in active if c.end_index_a >= line_start_index]
+            yield line, active
+
+            if line_end_index < 0:
+                break
+            line_start_index = line_end_index + 1
+            line_end_index = full_text.find('\n', line_start_index)
 
-    def open_file_to_write(self, rel_path: str) -> codecs.StreamReaderWriter:
-        full_path = os.path.join(self.output_folder, rel_path)
-        return codecs.open(full_path, 'w', encoding='utf-8')
+    @contextmanager
+    def open_file_to_write(self, rel_path: str) -> Iterator[TextIO]:
+        # the page is built in memory and written in one call
+        fw = io.StringIO()
+        yield fw
+        write_page(os.path.join(self.output_folder, rel_path), fw.getvalue())
 
     def render_styles(self):
         styles_folder = os.path.join(self.output_folder, 'css')
@@ -134,7 +205,7 @@ class HtmlSourceTreeRender(SourceTreeRender):
             }
             ''')
 
-    def render_head(self, node: FolderNode, fw: codecs.StreamReaderWriter):
+    def render_head(self, node: FolderNode, fw: TextIO):
         fw.write(f'''
         <html>
           <head>
@@ -145,10 +216,10 @@ class HtmlSourceTreeRender(SourceTreeRender):
           <body>\n
         ''')
 
-    def render_footer(self, fw: codecs.StreamReaderWriter):
+    def render_footer(self, fw: TextIO):
         fw.write('''\n  </body>\n</html>''')
 
-    def render_navigation_path(self, node: FolderNode, fw: codecs.StreamReaderWriter):
+    def render_navigation_path(self, node: FolderNode, fw: TextIO):
         if not node.ancestors:
             return
         fw.write('    <div>')
@@ -0,0 +1,136 @@
+import regex as re
+from typing import List, Optional, Tuple
+
+
+class PathMatcher:
+    # include / ignore patterns compiled once into a few regular expressions,
+    # the patterns follow .gitignore rules:
+    #   "*" matches anything but "/", "?" - any character but "/", "[abc]",
+    #   "[a-z]" and "[!a]" - a character of (not of) the set, "\" escapes
+    #   the next character. Names are compared case insensitive
+    # Patterns without "/", but a trailing one, match file or folder names
+    # at any level: "venv", "*.py", "test_*"
+    # Patterns with "/" are paths relative to the source folder:
+    #   "/docs/*.py", "src/**/generated_*.py" - "**" matches any number of folders
+    # A trailing "/" ("build/") matches folders only. "!" negates the pattern:
+    # the path matched by an earlier pattern is matched no more ("\!" is a "!").
+    # As in git, a file inside a matched folder can't be negated, the folder
+    # is skipped altogether
+    def __init__(self, patterns: List[str]):
+        # [(negative, [name, folder name, path, folder path regex strings]), ...],
+        # consecutive patterns of the same sign are compiled together
+        groups = []  # type: List[Tuple[bool, List[List[str]]]]
+        for pattern in patterns:
+            pattern = pattern.strip()
+            if not pattern or pattern.startswith('#'):
+                continue
+            negative = pattern.startswith('!')
+            if negative:
+                pattern = pattern[1:]
+            folders_only = pattern.endswith('/')
+            pattern = pattern.rstrip('/')
+            if not pattern:
+                continue
+            if not groups or groups[-1][0] != negative:
+                groups.append((negative, [[], [], [], []]))
+            regex_strings = groups[-1][1]
+            if '/' in pattern:
+                regex_str = self.translate_path_pattern(pattern.lstrip('/'))
+                regex_strings[3 if folders_only else 2].append(regex_str)
+            else:
+                regex_str = self.translate_name_pattern(pattern)
+                regex_strings[1 if folders_only else 0].append(regex_str)
+        # [(negative, name regex, folder name regex, path regex, folder path regex), ...]
+        self.groups = [(negative, *[self.compile(r) for r in regex_strings])
+                       for negative, regex_strings in groups]
+
+    def matches(self, name: str, rel_path: str, is_folder: bool) -> bool:
+        # rel_path is "/"-separated, relative to the source folder.
+        # The last matching pattern decides
+        for negative, name_regex, folder_name_regex, path_regex, folder_path_regex in reversed(self.groups):
+            if (name_regex and name_regex.match(name)) or \
+                    (path_regex and path_regex.match(rel_path)) or \
+                    (is_folder and folder_name_regex and folder_name_regex.match(name)) or \
+                    (is_folder and folder_path_regex and folder_path_regex.match(rel_path)):
+                return not negative
+        return False
+
+    @classmethod
+    def compile(cls, regex_strings: List[str]) -> Optional[re.Pattern]:
+        if not regex_strings:
+            return None
+        return re.compile('|'.join(f'(?:{r})' for r in regex_strings), re.IGNORECASE)
+
+    @classmethod
+    def translate_name_pattern(cls, pattern: str) -> str:
+        # the whole name should match, a name has no "/" to stop "*"
+        return cls.translate_path_pattern(pattern)
+
+    @classmethod
+    def translate_path_pattern(cls, pattern: str) -> str:
+        # fnmatch.translate(), but "*" and "?" don't cross "/"
+        regex_str = ''
+        i = 0
+        while i < len(pattern):
+            if pattern.startswith('**/', i):
+                regex_str += '(?:.*/)?'
+                i += 3
+                continue
+            if pattern.startswith('**', i):
+                regex_str += '.*'
+                i += 2
+                continue
+            c = pattern[i]
+            i += 1
+            if c == '*':
+                regex_str += '[^/]*'
+            elif c == '?':
+                regex_str += '[^/]'
+            elif c == '\\' and i < len(pattern):
+                regex_str += re.escape(pattern[i])
+                i += 1
+            elif c == '[':
+                end = cls.find_set_end(pattern, i)
+                if end < 0:
+                    regex_str += re.escape(c)
+                    continue
+                regex_str += cls.translate_set(pattern[i:end])
+                i = end + 1
+            else:
+                regex_str += re.escape(c)
+        return regex_str + r'\Z'
+
+    @classmethod
+    def find_set_end(cls, pattern: str, start: int) -> int:
+        # index of the "]" closing the set opened before "start", -1 if there's none.
+        # "]" right after "[" or "[!" is a set member
+        i = start
+        if i < len(pattern) and pattern[i] == '!':
+            i += 1
+        if i < len(pattern) and pattern[i] == ']':
+            i += 1
+        while i < len(pattern) and pattern[i] != ']':
+            i += 1
+        return i if i < len(pattern) else -1
+
+    @classmethod
+    def translate_set(cls, chars: str) -> str:
+        # the set's characters without the brackets: every character but the
+        # ranges' "-" is escaped, "!" negates the set
+        negative = chars.startswith('!')
+        if negative:
+            chars = chars[1:]
+        members = ''
+        i = 0
+        while i < len(chars):
+            if i + 2 < len(chars) and chars[i + 1] == '-':
+                if chars[i] <= chars[i + 2]:
+                    members += re.escape(chars[i]) + '-' + re.escape(chars[i + 2])
+                i += 3
+                continue
+            members += re.escape(chars[i])
+            i += 1
+        if not members:
+            # only reversed ranges ("[z-a]"), nothing is in the set
+            return '[^/]' if negative else '(?!)'
+        return ('[^/' if negative else '[') + members + ']'
@@ -1,10 +1,42 @@
 import os
+from concurrent.futures import ProcessPoolExecutor
 import regex as re
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Tuple, Iterable
 from astexplorer.ast_comparer import AstComparer, Copypaste
 from astexplorer.ast_parser import AstParser
 from astexplorer.func_tree import FuncTree
+from astexplorer.parse_cache import ParseCache
 from vizualization.folder_map import FolderNode
+from vizualization.path_matcher import PathMatcher
+
+
+def parse_source_file(file_path: str, cache: Optional[ParseCache] = None) -> List[FuncTree]:
+    # parse the file and prepare its functions for comparison
+    with open(file_path, 'rb') as fr:
+        data = fr.read()
+    cache_key = ''
+    if cache:
+        cache_key = cache.get_key(data)
+        functions = cache.load(cache_key, file_path)
+        if functions is not None:
+            return functions
+
+    functions = AstParser().parse_string(data.decode('utf-8'), file_path)
+    AstComparer().compare_pre_process_functions(functions)
+    for f in functions:
+        f.compact()
+    if cache:
+        cache.store(cache_key, functions)
+    return functions
+
+
+def try_parse_source_file(file_path: str, cache_folder: str = '') -> Tuple[List[FuncTree], str]:
+    # process pool worker: errors are returned, not raised
+    try:
+        cache = ParseCache(cache_folder) if cache_folder else None
+        return parse_source_file(file_path, cache), ''
+    except Exception as e:
+        return [], str(e)
 
 
 class SourceTreeRender:
@@ -13,6 +45,11 @@ class SourceTreeRender:
         self.output_folder = ''
         self.ignore_list: List[str] = ['venv']
         self.include_list: List[str] = ['*.py']
+        # add the patterns from the source folders' .gitignore files to ignore_list
+        self.read_gitignore = False
+        # include_list and ignore_list, compiled
+        self.include_matcher: Optional[PathMatcher] = None
+        self.ignore_matcher: Optional[PathMatcher] = None
         self.root_folder: Optional[FolderNode] = None
         self.functions: List[FuncTree] = []
         self.copypastes: List[Copypaste] = []
@@ -25,6 +62,18 @@ class SourceTreeRender:
         # copypaste filter params
         self.min_cps_len = 2
         self.min_cps_weight = 2
+        # processes parsing files, 0 or 1 means "parse in this process"
+        self.parse_workers = 0
+        # parsed files' cache, see ParseCache
+        self.cache_folder = ''
+        self.cache_max_size = 512 * 1024 * 1024
+        self.cache: Optional[ParseCache] = None
+        # AstComparer or its subclass, e.g. SuffixArrayComparer
+        self.comparer_class = AstComparer
+        # kept for update_sources()
+        self.comparer: Optional[AstComparer] = None
+        # { file path: (modification time, size) } of the files read
+        self.file_signatures: Dict[str, Tuple[int, int]] = {}
 
     def explore_sources(self,
                         source_folders: List[str],
@@ -32,29 +81,76 @@ class SourceTreeRender:
                         ignore_list: List[str] = None,
                         include_list: List[str] = None,
                         min_cps_len: int = 2,
-                        min_cps_weight: int = 2):
+                        min_cps_weight: int = 2,
+                        parse_workers: int = 0,
+                        cache_folder: str = ''):
         if not source_folders:
             raise ValueError('source_folders argument should contain at least one path')
         self.min_cps_len = min_cps_len
         self.min_cps_weight = min_cps_weight
+        self.parse_workers = parse_workers
+        self.cache_folder = cache_folder
         self.source_folders = source_folders
         self.output_folder = output_folder
         self.ignore_list = ignore_list if ignore_list is not None else self.ignore_list
         self.include_list = include_list if include_list is not None else self.include_list
 
+        if self.cache_folder:
+            self.cache = ParseCache(self.cache_folder, self.cache_max_size)
+        if not self.read_source_folders():
+            return
+        self.read_functions(self.root_folder)
+        self.find_copypastes()
+        self.summarize_node_stats()
+
+    def update_sources(self) -> None:
+        # read the source folders again, parse only the files changed since
+        # the previous explore_sources() / update_sources() call and compare
+        # only their functions
+        if not self.comparer:
+            raise ValueError('explore_sources() should be called before update_sources()')
+        old_func_by_path = self.func_by_path
+        old_signatures = self.file_signatures
+        old_errors = self.file_parse_errors
+        self.reset_sources()
+        if not self.read_source_folders():
+            return
+
+        file_paths = []  # type: List[str]
+        self.list_file_paths(self.root_folder, file_paths)
+        unchanged = {p: old_func_by_path.get(p, []) for p in file_paths
+                     if p in old_signatures and p not in old_errors
+                     and old_signatures[p] == self.get_file_signature(p)}
+        self.read_functions(self.root_folder, unchanged)
+        self.copypastes = self.comparer.update_copypastes(self.functions)
+        self.filter_copypastes()
+        self.summarize_node_stats()
+
+    def reset_sources(self) -> None:
+        self.root_folder = None
+        self.functions = []
+        self.copypastes = []
+        self.func_by_path = {}
+        self.cps_by_path = {}
+        self.file_parse_errors = {}
+        self.file_signatures = {}
+        self.total_files = 0
+        self.files_ok = 0
+        self.files_not_parsed = 0
+
+    def read_source_folders(self) -> bool:
+        self.compile_path_patterns()
         if len(self.source_folders) == 1:
-            self.read_folder_tree(source_folders[0], None)
+            self.read_folder_tree(self.source_folders[0], None)
         else:
             self.root_folder = FolderNode('.', '.', False)
             for path in self.source_folders:
                 self.read_folder_tree(path, self.root_folder)
         if not self.root_folder:
-            print(f'No source files / directories are found at {", ".join(source_folders)}')
-            return
+            print(f'No source files / directories are found at {", ".join(self.source_folders)}')
+            return False
         print(f'{self.total_files} files total')
-        self.read_functions(self.root_folder)
-        self.find_copypastes()
-        self.summarize_node_stats()
+        return True
 
     def render(self):
         raise NotImplemented()
@@ -90,29 +186,78 @@ class SourceTreeRender:
             node.statistics.longest = max(node.statistics.longest, child.statistics.longest)
 
     def find_copypastes(self) -> None:
-        cmp = AstComparer()
-        cmp.compare_pre_process_functions(self.functions)
-        self.copypastes = cmp.find_copypastes(self.functions)
+        # functions are pre-processed while reading files
+        self.comparer = self.comparer_class()
+        self.comparer.min_cp_weight = self.min_cps_weight
+        self.copypastes = self.comparer.find_copypastes(self.functions)
+        self.filter_copypastes()
+
+    def filter_copypastes(self) -> None:
         old_len = len(self.copypastes)
         self.copypastes = [c for c in self.copypastes
                            if c.count >= self.min_cps_len and c.weight >= self.min_cps_weight]
         print(f'{old_len} copy-pastes are found, {len(self.copypastes)} left after filtering')
 
-    def read_functions(self, node: FolderNode) -> None:
-        if node.is_file:
+    def read_functions(self,
+                       node: FolderNode,
+                       unchanged: Optional[Dict[str, List[FuncTree]]] = None) -> None:
+        # read functions from the node's files in the folder tree order,
+        # "unchanged" are already parsed files' functions
+        file_paths = []  # type: List[str]
+        self.list_file_paths(node, file_paths)
+        unchanged = unchanged or {}
+        for file_path in file_paths:
+            self.file_signatures[file_path] = self.get_file_signature(file_path)
+        parsed = self.parse_files([p for p in file_paths if p not in unchanged])
+        for file_path in file_paths:
+            if file_path in unchanged:
+                self.store_file_functions(file_path, unchanged[file_path], '')
+                continue
+            functions, error = next(parsed)
+            self.store_file_functions(file_path, functions, error)
+        parsed.close()
+        if self.cache:
+            self.cache.trim()
+
+    def parse_files(self, file_paths: List[str]) -> Iterable[Tuple[List[FuncTree], str]]:
+        # yields (functions, error) for each file, in the files' order
+        if self.parse_workers > 1 and len(file_paths) > 1:
+            # parse files in self.parse_workers processes
+            chunk_size = max(1, len(file_paths) // (self.parse_workers * 8))
+            with ProcessPoolExecutor(max_workers=self.parse_workers) as executor:
+                yield from executor.map(try_parse_source_file, file_paths,
+                                        [self.cache_folder] * len(file_paths), chunksize=chunk_size)
+            return
+        for file_path in file_paths:
             try:
-                functions = AstParser().parse_module(node.full_path)
-                self.functions += functions
-                self.files_ok += 1
-                self.report_file_parsing_progress()
+                yield parse_source_file(file_path, self.cache), ''
             except Exception as e:
-                print(f'There were error parsing file "{node.full_path}": {e}')
-                self.file_parse_errors[node.full_path] = str(e)
-                self.files_not_parsed += 1
-                self.report_file_parsing_progress()
+                yield [], str(e)
+
+    def list_file_paths(self, node: FolderNode, file_paths: List[str]) -> None:
+        if node.is_file:
+            file_paths.append(node.full_path)
             return
         for child in node.children:
-            self.read_functions(child)
+            self.list_file_paths(child, file_paths)
+
+    def store_file_functions(self, file_path: str, functions: List[FuncTree], error: str) -> None:
+        if error:
+            print(f'There were error parsing file "{file_path}": {error}')
+            self.file_parse_errors[file_path] = error
+            self.files_not_parsed += 1
+        else:
+            self.functions += functions
+            self.files_ok += 1
+        self.report_file_parsing_progress()
+
+    @classmethod
+    def get_file_signature(cls, file_path: str) -> Tuple[int, int]:
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return 0, -1
+        return stat.st_mtime_ns, stat.st_size
 
     def report_file_parsing_progress(self):
         percent_int = int(1000 * (self.files_not_parsed + self.files_ok) / self.total_files)
@@ -122,40 +267,98 @@ class SourceTreeRender:
         else:
             print(f'progress: {percent}%, {self.files_ok} parsed')
 
-    def read_folder_tree(self, path: str, parent: Optional[FolderNode]) -> None:
-        if not self.should_parse(path):
+    def read_folder_tree(self, path: str, parent: Optional[FolderNode],
+                         is_file: Optional[bool] = None, rel_path: str = '') -> None:
+        # rel_path is the "/"-separated path relative to the source folder,
+        # is_file comes from the parent folder's scandir() entry
+        if is_file is None:
+            is_file = os.path.isfile(path)
+        if not self.should_parse(path, is_file, rel_path):
             return
-        node = FolderNode(path)
+        node = FolderNode(path, is_file=is_file)
         if not parent:
             self.root_folder = node
         else:
             node.ancestors = list(parent.ancestors)
             node.ancestors.append(parent)
             parent.children.append(node)
-        if os.path.isdir(path):
-            for file_name in os.listdir(path):
-                sub_path = os.path.join(path, file_name)
-                self.read_folder_tree(sub_path, node)
+        if not is_file and os.path.isdir(path):
+            for entry in self.scan_folder(path):
+                self.read_folder_tree(entry.path, node, not entry.is_dir(),
+                                      self.join_rel_path(rel_path, entry.name))
         else:
             self.total_files += 1
 
-    def should_parse(self, path: str) -> bool:
+    def has_source_changes(self) -> bool:
+        # polls the source folders: files added, removed or modified
+        # since the previous explore_sources() / update_sources() call
+        file_paths = []  # type: List[str]
+        self.compile_path_patterns()
+        for path in self.source_folders:
+            self.list_source_files(path, file_paths)
+        if len(file_paths) != len(self.file_signatures):
+            return True
+        for file_path in file_paths:
+            signature = self.file_signatures.get(file_path)
+            if signature is None or signature != self.get_file_signature(file_path):
+                return True
+        return False
+
+    def list_source_files(self, path: str, file_paths: List[str],
+                          is_file: Optional[bool] = None, rel_path: str = '') -> None:
+        # the files read_folder_tree() would find
+        if is_file is None:
+            is_file = os.path.isfile(path)
+        if not self.should_parse(path, is_file, rel_path):
+            return
+        if not is_file and os.path.isdir(path):
+            for entry in self.scan_folder(path):
+                self.list_source_files(entry.path, file_paths, not entry.is_dir(),
+                                       self.join_rel_path(rel_path, entry.name))
+        else:
+            file_paths.append(path)
+
+    @classmethod
+    def scan_folder(cls, path: str) -> List[os.DirEntry]:
+        with os.scandir(path) as entries:
+            return list(entries)
+
+    @classmethod
+    def join_rel_path(cls, rel_path: str, name: str) -> str:
+        return f'{rel_path}/{name}' if rel_path else name
+
+    def should_parse(self, path: str, is_file: Optional[bool] = None, rel_path: str = '') -> bool:
         file_name = os.path.basename(path)
-        is_file = os.path.isfile(path)
+        if is_file is None:
+            is_file = os.path.isfile(path)
+        rel_path = rel_path or file_name
+        if self.include_matcher is None or self.ignore_matcher is None:
+            self.compile_path_patterns()
         if is_file and self.include_list and \
-                not any([self.name_matches_pattern(file_name, p) for p in self.include_list]):
+                not self.include_matcher.matches(file_name, rel_path, False):
             return False
-        if self.ignore_list and \
-                any([self.name_matches_pattern(file_name, p) for p in self.ignore_list]):
+        if self.ignore_list is not None and self.ignore_matcher.matches(file_name, rel_path, not is_file):
             return False
         return True
 
+    def compile_path_patterns(self) -> None:
+        ignore_list = list(self.ignore_list or [])
+        if self.read_gitignore:
+            for folder in self.source_folders:
+                ignore_list += self.read_gitignore_patterns(folder)
+        self.include_matcher = PathMatcher(self.include_list or [])
+        self.ignore_matcher = PathMatcher(ignore_list)
+
     @classmethod
-    def name_matches_pattern(cls, name: str, ptrn: str):
-        if '*' in ptrn:
-            regex_str = re.sub(r'\.', r'\.', ptrn)
-            regex_str = re.sub(r'\*', '.*', regex_str)
-            reg = re.compile(regex_str, re.IGNORECASE)
-            return reg.match(name)
+    def read_gitignore_patterns(cls, folder: str) -> List[str]:
+        try:
+            with open(os.path.join(folder, '.gitignore'), 'r', encoding='utf-8') as fr:
+                return fr.read().splitlines()
+        except OSError:
+            return []
 
-        return name.lower() == ptrn.lower()
+    @classmethod
+    def name_matches_pattern(cls, name: str, ptrn: str):
+        # a single name pattern, as PathMatcher reads it
+        reg = re.compile(PathMatcher.translate_name_pattern(ptrn), re.IGNORECASE)
+        return reg.match(name)
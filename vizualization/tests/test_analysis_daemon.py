@@ -0,0 +1,114 @@
+import asyncio
+import os
+import shutil
+import socket
+import tempfile
+from unittest import TestCase
+
+from vizualization.analysis_daemon import AnalysisDaemon, send_request
+from vizualization.source_tree_render import SourceTreeRender
+
+
+class TestAnalysisDaemon(TestCase):
+    def test_daemon(self):
+        cur_folder = os.path.dirname(os.path.abspath(__file__))
+        with tempfile.TemporaryDirectory() as folder:
+            src_folder = os.path.join(folder, 'code_folder')
+            shutil.copytree(os.path.join(cur_folder, 'code_folder'), src_folder)
+            render = SourceTreeRender()
+            # the render's paths are relative, requests' paths may be absolute
+            render.explore_sources([os.path.relpath(src_folder)])
+            daemon = AnalysisDaemon(render, os.path.join(folder, 'daemon.sock'), poll_interval=60)
+            asyncio.run(self.check_daemon(daemon, src_folder))
+            self.assertFalse(os.path.exists(daemon.socket_path))
+
+    def test_socket_path_taken(self):
+        cur_folder = os.path.dirname(os.path.abspath(__file__))
+        with tempfile.TemporaryDirectory() as folder:
+            render = SourceTreeRender()
+            render.explore_sources([os.path.join(cur_folder, 'code_folder')])
+            # a regular file or a symlink at the socket path is never removed
+            file_path = os.path.join(folder, 'daemon.sock')
+            with open(file_path, 'w') as fw:
+                fw.write('data')
+            link_path = os.path.join(folder, 'link.sock')
+            os.symlink(file_path, link_path)
+            for path in [file_path, link_path]:
+                daemon = AnalysisDaemon(render, path, poll_interval=60)
+                with self.assertRaises(FileExistsError):
+                    asyncio.run(daemon.run())
+                self.assertTrue(os.path.lexists(path))
+            with open(file_path, 'r') as fr:
+                self.assertEqual('data', fr.read())
+
+            # a socket another process listens on is kept
+            listened_path = os.path.join(folder, 'listened.sock')
+            listened = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            listened.bind(listened_path)
+            listened.listen()
+            try:
+                daemon = AnalysisDaemon(render, listened_path, poll_interval=60)
+                with self.assertRaises(FileExistsError):
+                    asyncio.run(daemon.run())
+                self.assertTrue(AnalysisDaemon.is_socket(listened_path))
+            finally:
+                listened.close()
+
+            # a stale socket is replaced
+            stale_path = os.path.join(folder, 'stale.sock')
+            stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            stale.bind(stale_path)
+            stale.close()
+            daemon = AnalysisDaemon(render, stale_path, poll_interval=60)
+            asyncio.run(self.check_stop(daemon))
+            self.assertFalse(os.path.exists(stale_path))
+
+    async def check_stop(self, daemon: AnalysisDaemon):
+        server = asyncio.create_task(daemon.run())
+        while daemon.server is None:
+            await asyncio.sleep(0.01)
+        response = await send_request(daemon.socket_path, {'command': 'stop'})
+        self.assertEqual({'stopped': True}, response)
+        await server
+
+    async def check_daemon(self, daemon: AnalysisDaemon, src_folder: str):
+        server = asyncio.create_task(daemon.run())
+        while not os.path.exists(daemon.socket_path):
+            await asyncio.sleep(0.01)
+
+        status = await send_request(daemon.socket_path, {'command': 'status'})
+        self.assertEqual(0, status['version'])
+        self.assertGreater(status['copypastes'], 0)
+        self.assertEqual(len(daemon.render.functions), status['functions'])
+
+        response = await send_request(daemon.socket_path, {'command': 'copypastes', 'limit': 2})
+        self.assertEqual(2, len(response['copypastes']))
+        file_path = response['copypastes'][0]['file_a']
+        self.assertFalse(os.path.isabs(file_path))
+        response = await send_request(daemon.socket_path, {'command': 'copypastes', 'file': file_path})
+        self.assertGreater(len(response['copypastes']), 0)
+        self.assertTrue(all(file_path in (c['file_a'], c['file_b']) for c in response['copypastes']))
+        abs_response = await send_request(daemon.socket_path,
+                                          {'command': 'copypastes', 'file': os.path.abspath(file_path)})
+        self.assertEqual(response, abs_response)
+
+        # nothing changed
+        response = await send_request(daemon.socket_path, {'command': 'update'})
+        self.assertEqual({'version': 0, 'updated': False}, response)
+
+        # a new file duplicating an existing one
+        with open(file_path, 'r') as fr:
+            data = fr.read()
+        new_path = os.path.join(src_folder, 'copy_of_file.py')
+        with open(new_path, 'w') as fw:
+            fw.write(data)
+        response = await send_request(daemon.socket_path, {'command': 'update'})
+        self.assertEqual({'version': 1, 'updated': True}, response)
+        response = await send_request(daemon.socket_path, {'command': 'copypastes', 'file': new_path})
+        self.assertGreater(len(response['copypastes']), 0)
+
+        response = await send_request(daemon.socket_path, {'command': 'unknown'})
+        self.assertIn('error', response)
+        response = await send_request(daemon.socket_path, {'command': 'stop'})
+        self.assertEqual({'stopped': True}, response)
+        await server
@@ -0,0 +1,77 @@
+from unittest import TestCase
+
+from vizualization.path_matcher import PathMatcher
+from vizualization.source_tree_render import SourceTreeRender
+
+
+class TestPathMatcher(TestCase):
+    def test_name_patterns(self):
+        patterns = ['venv', '*.py', 'test_*']
+        matcher = PathMatcher(patterns)
+        for name in ['venv', 'VENV', 'venv2', 'main.py', 'main.pyc', 'main_py', 'test_a.txt', 'a_test']:
+            self.assertEqual(any(SourceTreeRender.name_matches_pattern(name, p) for p in patterns),
+                             matcher.matches(name, f'folder/{name}', False), name)
+        self.assertEqual([True, True, False, False, True, False, True, False],
+                         [matcher.matches(n, n, False) for n in
+                          ['venv', 'VENV', 'venv2', 'main.pyc', 'main.py', 'main_py', 'test_a.txt', 'a_test']])
+
+    def test_glob_characters(self):
+        matcher = PathMatcher(['*.py?', 'file[abc].txt', 'log[!0-9]', 'data[0-9]?.csv'])
+        self.assertTrue(matcher.matches('a.pyc', 'a.pyc', False))
+        self.assertFalse(matcher.matches('a.py', 'a.py', False))
+        self.assertFalse(matcher.matches('a.pycc', 'a.pycc', False))
+        self.assertTrue(matcher.matches('fileb.txt', 'fileb.txt', False))
+        self.assertFalse(matcher.matches('filed.txt', 'filed.txt', False))
+        self.assertTrue(matcher.matches('logs', 'logs', False))
+        self.assertFalse(matcher.matches('log1', 'log1', False))
+        self.assertTrue(matcher.matches('data12.csv', 'data12.csv', False))
+        self.assertFalse(matcher.matches('data1.csv', 'data1.csv', False))
+
+    def test_metacharacters(self):
+        # regular expression syntax is taken literally
+        matcher = PathMatcher(['*(', 'a+b', '$x', 'v1.0', '[', 'x]', '{1}', 'q|r', 'esc\\*', 'set[]a]'])
+        for name in ['f(', 'a+b', '$x', 'v1.0', '[', 'x]', '{1}', 'q|r', 'esc*', 'set]', 'seta']:
+            self.assertTrue(matcher.matches(name, name, False), name)
+        for name in ['f', 'aab', 'x', 'v1x0', 'x', '1', 'q', 'escape', 'setb']:
+            self.assertFalse(matcher.matches(name, name, False), name)
+
+    def test_gitignore_star(self):
+        # "*" doesn't cross "/", name patterns match at any level
+        matcher = PathMatcher(['*.log', 'docs/*.md', 'out*/'])
+        self.assertTrue(matcher.matches('a.log', 'a.log', False))
+        self.assertTrue(matcher.matches('a.log', 'x/y/a.log', False))
+        self.assertFalse(matcher.matches('a.log.txt', 'a.log.txt', False))
+        self.assertTrue(matcher.matches('a.md', 'docs/a.md', False))
+        self.assertFalse(matcher.matches('a.md', 'docs/x/a.md', False))
+        self.assertTrue(matcher.matches('output', 'output', True))
+        self.assertFalse(matcher.matches('output', 'output', False))
+
+    def test_negation(self):
+        matcher = PathMatcher(['*.py', '!keep_*.py', 'keep_no.py', '/build', '!/src/build', '\\!bang'])
+        self.assertTrue(matcher.matches('a.py', 'a.py', False))
+        self.assertFalse(matcher.matches('keep_a.py', 'x/keep_a.py', False))
+        self.assertTrue(matcher.matches('keep_no.py', 'keep_no.py', False))
+        # anchored to the source folder
+        self.assertTrue(matcher.matches('build', 'build', True))
+        self.assertFalse(matcher.matches('build', 'src/build', True))
+        self.assertTrue(matcher.matches('!bang', '!bang', False))
+        self.assertFalse(matcher.matches('bang', 'bang', False))
+        self.assertFalse(PathMatcher(['!a.py']).matches('a.py', 'a.py', False))
+
+    def test_path_patterns(self):
+        matcher = PathMatcher(['/docs/*.py', 'src/**/gen_*.py', 'build/', 'data/file?.[ct]sv', 'lib/[!a]*'])
+        self.assertTrue(matcher.matches('conf.py', 'docs/conf.py', False))
+        self.assertFalse(matcher.matches('index.py', 'docs/api/index.py', False))
+        self.assertTrue(matcher.matches('gen_a.py', 'src/gen_a.py', False))
+        self.assertTrue(matcher.matches('gen_a.py', 'src/x/y/gen_a.py', False))
+        self.assertFalse(matcher.matches('gen_a.py', 'tools/gen_a.py', False))
+        self.assertTrue(matcher.matches('build', 'build', True))
+        self.assertFalse(matcher.matches('build', 'build', False))
+        self.assertTrue(matcher.matches('file1.csv', 'data/file1.csv', False))
+        self.assertFalse(matcher.matches('file12.csv', 'data/file12.csv', False))
+        self.assertTrue(matcher.matches('b.py', 'lib/b.py', False))
+        self.assertFalse(matcher.matches('a.py', 'lib/a.py', False))
+
+    def test_comments_and_empty(self):
+        matcher = PathMatcher(['', '# comment', '  '])
+        self.assertFalse(matcher.matches('comment', 'comment', False))
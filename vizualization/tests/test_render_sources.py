@@ -1,7 +1,13 @@
 import os
+import random
+import shutil
+import tempfile
+from types import SimpleNamespace
 from unittest import TestCase
 
+from astexplorer.suffix_array_comparer import SuffixArrayComparer
 from vizualization.html_source_tree_render import HtmlSourceTreeRender
+from vizualization.source_tree_render import SourceTreeRender
 
 
 class TestRenderSources(TestCase):
@@ -16,3 +22,151 @@ class TestRenderSources(TestCase):
         render = HtmlSourceTreeRender()
         render.explore_sources([src_folder], out_folder, min_cps_len=4)
         render.render()
+
+    def test_parallel_parsing(self):
+        cur_folder = os.path.dirname(os.path.abspath(__file__))
+        src_folder = os.path.join(cur_folder, 'code_folder')
+
+        serial = SourceTreeRender()
+        serial.explore_sources([src_folder])
+        parallel = SourceTreeRender()
+        parallel.explore_sources([src_folder], parse_workers=3)
+
+        self.assertEqual(serial.files_ok, parallel.files_ok)
+        self.assertEqual([(f.file, f.name) for f in serial.functions],
+                         [(f.file, f.name) for f in parallel.functions])
+        self.assertGreater(len(serial.copypastes), 0)
+        self.assertEqual([(c.func_a.file, c.func_b.file, c.count, c.weight, c.start_index_a, c.end_index_a)
+                          for c in serial.copypastes],
+                         [(c.func_a.file, c.func_b.file, c.count, c.weight, c.start_index_a, c.end_index_a)
+                          for c in parallel.copypastes])
+
+    def test_parse_cache(self):
+        cur_folder = os.path.dirname(os.path.abspath(__file__))
+        src_folder = os.path.join(cur_folder, 'code_folder')
+
+        with tempfile.TemporaryDirectory() as cache_folder:
+            renders = []
+            for _ in range(2):
+                render = SourceTreeRender()
+                render.explore_sources([src_folder], cache_folder=cache_folder)
+                renders.append(render)
+            self.assertEqual(0, renders[0].cache.hits)
+            self.assertEqual(renders[1].files_ok, renders[1].cache.hits)
+            self.assertEqual([(c.func_a.file, c.func_b.file, c.count, c.weight, c.start_index_a)
+                              for c in renders[0].copypastes],
+                             [(c.func_a.file, c.func_b.file, c.count, c.weight, c.start_index_a)
+                              for c in renders[1].copypastes])
+
+    def test_update_sources(self):
+        cur_folder = os.path.dirname(os.path.abspath(__file__))
+        with tempfile.TemporaryDirectory() as temp_folder:
+            src_folder = os.path.join(temp_folder, 'code_folder')
+            shutil.copytree(os.path.join(cur_folder, 'code_folder'), src_folder)
+            render = SourceTreeRender()
+            render.explore_sources([src_folder])
+            unchanged_path = os.path.join(src_folder, 'legacy.py')
+            unchanged_functions = render.func_by_path[unchanged_path]
+
+            with open(os.path.join(src_folder, 'main_entry.py'), 'a') as fw:
+                fw.write('\n\ndef appended(a):\n    b = a * 2\n    print(b)\n    return b\n')
+            os.remove(os.path.join(src_folder, 'hrana', 'fodder.py'))
+            render.update_sources()
+
+            full = SourceTreeRender()
+            full.explore_sources([src_folder])
+            self.assertIs(unchanged_functions[0], render.func_by_path[unchanged_path][0])
+            self.assertEqual(full.root_folder.statistics.functions, render.root_folder.statistics.functions)
+            self.assertEqual([(c.func_a.file, c.func_b.file, c.count, c.weight, c.start_index_a)
+                              for c in full.copypastes],
+                             [(c.func_a.file, c.func_b.file, c.count, c.weight, c.start_index_a)
+                              for c in render.copypastes])
+
+    def test_iterate_lines(self):
+        text = 'line one\nline two\n\nline four\nlast line'
+        rnd = random.Random(1)
+        spans = []
+        for _ in range(30):
+            start = rnd.randint(0, len(text))
+            spans.append(SimpleNamespace(start_index_a=start, end_index_a=rnd.randint(start, len(text))))
+
+        line_start = 0
+        for line, line_spans in HtmlSourceTreeRender.iterate_lines(text, spans):
+            line_end = line_start + len(line)
+            expected = sorted([c for c in spans if c.start_index_a <= line_end and c.end_index_a >= line_start],
+                              key=lambda c: c.start_index_a)
+            self.assertEqual([id(c) for c in expected], [id(c) for c in line_spans])
+            line_start = line_end + 1
+        self.assertEqual(len(text) + 1, line_start)
+
+    def test_render_to_folder(self):
+        cur_folder = os.path.dirname(os.path.abspath(__file__))
+        src_folder = os.path.join(cur_folder, 'code_folder')
+        with tempfile.TemporaryDirectory() as out_folder:
+            render = HtmlSourceTreeRender()
+            render.explore_sources([src_folder], out_folder)
+            render.render()
+            with open(os.path.join(out_folder, 'index.html'), encoding='utf-8') as fr:
+                self.assertIn('code_folder', fr.read())
+            pages = [f for f in os.listdir(out_folder) if f.endswith('.html')]
+            self.assertGreater(len(pages), 1)
+
+    def test_parallel_render(self):
+        cur_folder = os.path.dirname(os.path.abspath(__file__))
+        src_folder = os.path.join(cur_folder, 'code_folder')
+        with tempfile.TemporaryDirectory() as out_folder:
+            serial_folder = os.path.join(out_folder, 'serial')
+            parallel_folder = os.path.join(out_folder, 'parallel')
+            os.mkdir(serial_folder)
+            os.mkdir(parallel_folder)
+            render = HtmlSourceTreeRender()
+            render.explore_sources([src_folder], serial_folder)
+            render.render()
+            render.output_folder = parallel_folder
+            render.render_workers = 3
+            render.render()
+
+            page_names = sorted(os.listdir(serial_folder))
+            self.assertEqual(page_names, sorted(os.listdir(parallel_folder)))
+            for page_name in page_names:
+                if not page_name.endswith('.html'):
+                    continue
+                with open(os.path.join(serial_folder, page_name), 'rb') as fr:
+                    serial_page = fr.read()
+                with open(os.path.join(parallel_folder, page_name), 'rb') as fr:
+                    self.assertEqual(serial_page, fr.read(), page_name)
+
+    def test_suffix_array_comparer(self):
+        cur_folder = os.path.dirname(os.path.abspath(__file__))
+        src_folder = os.path.join(cur_folder, 'code_folder')
+        render = SourceTreeRender()
+        render.comparer_class = SuffixArrayComparer
+        render.explore_sources([src_folder])
+        self.assertIsInstance(render.comparer, SuffixArrayComparer)
+        self.assertGreater(len(render.copypastes), 0)
+        self.assertEqual(len(render.copypastes), render.root_folder.statistics.copypastes)
+
+    def test_path_patterns(self):
+        with tempfile.TemporaryDirectory() as src_folder:
+            for rel_path in ['main.py', 'readme.txt', 'venv/lib.py', 'build/out.py',
+                             'src/app.py', 'src/generated_app.py', 'src/sub/generated_model.py',
+                             'docs/conf.py', 'docs/api/index.py']:
+                path = os.path.join(src_folder, *rel_path.split('/'))
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, 'w') as fw:
+                    fw.write('a = 1\n')
+            with open(os.path.join(src_folder, '.gitignore'), 'w') as fw:
+                fw.write('# generated\nbuild/\nsrc/**/generated_*.py\n')
+
+            render = SourceTreeRender()
+            render.ignore_list = ['venv', '/docs/*.py']
+            render.read_gitignore = True
+            render.source_folders = [src_folder]
+            file_paths = []
+            render.compile_path_patterns()
+            render.list_source_files(src_folder, file_paths)
+            rel_paths = sorted(os.path.relpath(p, src_folder).replace(os.sep, '/') for p in file_paths)
+            self.assertEqual(['docs/api/index.py', 'main.py', 'src/app.py'], rel_paths)
+
+            render.read_source_folders()
+            self.assertEqual(3, render.total_files)